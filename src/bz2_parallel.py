@@ -0,0 +1,364 @@
+"""
+Parallel bz2 compression and decompression functions.
+
+A bz2 file is a sequence of streams, each made of independent blocks of at
+most 900 kB of uncompressed data. The blocks are not aligned on bytes: they
+are found by searching their 48 bits magic number at every bit offset. Each
+block is then wrapped into a standalone single-block stream and decompressed
+on its own, like pbzip2 does.
+
+The compression and decompression of the `bz2` module release the GIL, so the
+blocks are processed by a pool of threads, without copying data between
+processes.
+
+To run the benchmark on the test dataset:
+python3 -m src.bz2_parallel
+"""
+import bz2
+import mmap
+import os
+import time
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .paths import TEST_DATA_PATH
+
+# Magic numbers of the bz2 format
+BLOCK_MAGIC = 0x314159265359
+EOS_MAGIC = 0x177245385090
+MAGIC_BITS = 48
+CRC_BITS = 32
+STREAM_HEADER = b'BZh'
+
+# Size of the uncompressed chunks compressed in parallel
+COMPRESS_CHUNKSIZE = 900_000
+
+
+def find_bit_pattern(data: bytes, pattern: int, nbits: int = MAGIC_BITS) \
+        -> list:
+    """Returns the bit positions of a pattern in data, at any bit offset.
+
+    Args:
+        data (bytes): data.
+        pattern (int): pattern to search.
+        nbits (int, optional): number of bits of the pattern.
+        Defaults to MAGIC_BITS.
+
+    Returns:
+        list: sorted bit positions (from the most significant bit of the
+        first byte).
+    """
+    positions = list()
+    for shift in range(8):
+        # Pattern aligned on the bytes of a window starting at the shift
+        size = (shift + nbits + 7) // 8
+        padding = 8 * size - shift - nbits
+        window = (pattern << padding).to_bytes(size, 'big')
+        first_mask = 0xFF >> shift
+        last_mask = (0xFF << padding) & 0xFF
+
+        # Search the bytes fully covered by the pattern
+        start = 1 if shift else 0
+        stop = size - 1 if padding else size
+        key = window[start:stop]
+
+        index = data.find(key)
+        while index != -1:
+            k = index - start
+            if 0 <= k and k + size <= len(data):
+                # Check the bits of the partially covered bytes
+                first = data[k] & first_mask == window[0] & first_mask
+                last = data[k + size - 1] & last_mask == window[-1] & last_mask
+                if first and last:
+                    positions.append(8 * k + shift)
+            index = data.find(key, index + 1)
+
+    positions.sort()
+    return positions
+
+
+def find_bz2_blocks(data: bytes) -> list:
+    """Returns the blocks of a bz2 file, including multi-stream files.
+
+    Args:
+        data (bytes): content of the bz2 file.
+
+    Raises:
+        ValueError: if the structure of the file is not valid.
+
+    Returns:
+        list: tuples (level, start bit, end bit) of the blocks.
+    """
+    block_positions = find_bit_pattern(data, BLOCK_MAGIC)
+    eos_positions = find_bit_pattern(data, EOS_MAGIC)
+    markers = [(position, False) for position in block_positions]
+    markers.extend((position, True) for position in eos_positions)
+    markers.sort()
+    marker_positions = [position for position, _ in markers]
+
+    blocks = list()
+    pos = 0
+    while pos + 4 <= len(data) and data[pos:pos + 3] == STREAM_HEADER:
+        level = data[pos + 3:pos + 4]
+        if not level.isdigit() or level == b'0':
+            raise ValueError(f'Invalid bz2 block size at byte {pos}')
+
+        # The first marker must follow the stream header
+        i = bisect_left(marker_positions, 8 * (pos + 4))
+        if i == len(markers) or markers[i][0] != 8 * (pos + 4):
+            raise ValueError(f'Invalid bz2 stream at byte {pos}')
+
+        # Blocks of the stream until the end of stream marker
+        while not markers[i][1]:
+            if i + 1 == len(markers):
+                raise ValueError('Missing bz2 end of stream marker')
+            blocks.append((level, markers[i][0], markers[i + 1][0]))
+            i += 1
+
+        # Next stream starts on the byte after the combined CRC
+        pos = (markers[i][0] + MAGIC_BITS + CRC_BITS + 7) // 8
+
+    if not blocks and data:
+        raise ValueError('No bz2 block found')
+
+    return blocks
+
+
+def decompress_block(data: bytes, level: bytes, start: int, end: int) \
+        -> bytes:
+    """Decompresses a single bz2 block from its bit positions.
+
+    The block is copied into a new single-block stream, whose combined CRC
+    is the CRC of the block.
+
+    Args:
+        data (bytes): content of the bz2 file.
+        level (bytes): block size of the stream (b'1' to b'9').
+        start (int): bit position of the block magic number.
+        end (int): bit position of the next marker.
+
+    Returns:
+        bytes: uncompressed data of the block.
+    """
+    nbits = end - start
+    stop = (end + 7) // 8
+    bits = int.from_bytes(data[start // 8:stop], 'big')
+    bits >>= 8 * stop - end
+    bits &= (1 << nbits) - 1
+
+    # CRC of the block stored after its magic number
+    crc = (bits >> (nbits - MAGIC_BITS - CRC_BITS)) & 0xFFFFFFFF
+
+    # Block + end of stream marker + combined CRC + padding
+    bits = (bits << MAGIC_BITS | EOS_MAGIC) << CRC_BITS | crc
+    nbits += MAGIC_BITS + CRC_BITS
+    padding = -nbits % 8
+    stream = bits << padding
+    return bz2.decompress(
+        STREAM_HEADER + level + stream.to_bytes((nbits + padding) // 8, 'big')
+    )
+
+
+def iter_decompress_bz2_sequential(filename: str, skip: int = 0):
+    """Yields the uncompressed data of a bz2 file, decompressed sequentially
+    with the `bz2` module.
+
+    Args:
+        filename (str): path to the bz2 file.
+        skip (int, optional): number of uncompressed bytes to skip.
+        Defaults to 0.
+
+    Yields:
+        bytes: uncompressed data.
+    """
+    with bz2.open(filename, 'rb') as f_bz2:
+        if skip:
+            f_bz2.seek(skip)
+        while chunk := f_bz2.read(COMPRESS_CHUNKSIZE):
+            yield chunk
+
+
+def iter_decompress_bz2(filename: str, max_workers: int = None):
+    """Yields the uncompressed data of a bz2 file, block by block and in
+    order. The blocks are decompressed in parallel.
+
+    If the blocks of the file cannot be located, the file is decompressed
+    sequentially with the `bz2` module. A magic number can also appear by
+    chance inside the compressed data, and then splits a block into invalid
+    ones: the data after the last valid block is then decompressed
+    sequentially.
+
+    Args:
+        filename (str): path to the bz2 file.
+        max_workers (int, optional): number of threads. Defaults to None
+        (number of processors).
+
+    Yields:
+        bytes: uncompressed data.
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    with open(filename, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            try:
+                blocks = find_bz2_blocks(data)
+            except ValueError:
+                blocks = None
+
+            if blocks is None:
+                # Fallback to sequential decompression
+                yield from iter_decompress_bz2_sequential(filename)
+                return
+
+            # Keep a bounded number of blocks in progress
+            size = 0
+            try:
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    futures = deque()
+                    for block in blocks:
+                        futures.append(
+                            executor.submit(decompress_block, data, *block)
+                        )
+                        if len(futures) >= 2 * max_workers:
+                            chunk = futures.popleft().result()
+                            size += len(chunk)
+                            yield chunk
+                    while futures:
+                        chunk = futures.popleft().result()
+                        size += len(chunk)
+                        yield chunk
+            except (OSError, ValueError):
+                # Invalid block from a spurious magic number
+                yield from iter_decompress_bz2_sequential(filename, size)
+
+
+def iter_lines_bz2(filename: str, max_workers: int = None):
+    """Yields the lines of a bz2 file in order, decompressing its blocks in
+    parallel.
+
+    Args:
+        filename (str): path to the bz2 file.
+        max_workers (int, optional): number of threads. Defaults to None
+        (number of processors).
+
+    Yields:
+        bytes: line without the line break.
+    """
+    buffer = b''
+    for chunk in iter_decompress_bz2(filename, max_workers):
+        lines = (buffer + chunk).split(b'\n')
+        buffer = lines.pop()
+        yield from lines
+    if buffer:
+        yield buffer
+
+
+def read_lines_bz2(filename: str, max_workers: int = None) -> list:
+    """Returns the lines of a bz2 file, decompressing its blocks in parallel.
+
+    Args:
+        filename (str): path to the bz2 file.
+        max_workers (int, optional): number of threads. Defaults to None
+        (number of processors).
+
+    Returns:
+        list: lines without the line breaks.
+    """
+    return list(iter_lines_bz2(filename, max_workers))
+
+
+def compress_bz2(
+    data: bytes,
+    max_workers: int = None,
+    chunksize: int = COMPRESS_CHUNKSIZE,
+    compresslevel: int = 9,
+) -> bytes:
+    """Compresses data in parallel into a multi-stream bz2 content, which can
+    be read by any bz2 decompressor.
+
+    Args:
+        data (bytes): uncompressed data.
+        max_workers (int, optional): number of threads. Defaults to None
+        (number of processors).
+        chunksize (int, optional): size of the data compressed in each
+        stream. Defaults to COMPRESS_CHUNKSIZE.
+        compresslevel (int, optional): bz2 compression level. Defaults to 9.
+
+    Returns:
+        bytes: compressed data.
+    """
+    chunks = [
+        data[i:i + chunksize] for i in range(0, len(data), chunksize)
+    ]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        streams = executor.map(
+            lambda chunk: bz2.compress(chunk, compresslevel), chunks
+        )
+        return b''.join(streams)
+
+
+def write_bz2(
+    filename: str,
+    data: bytes,
+    max_workers: int = None,
+    compresslevel: int = 9,
+) -> None:
+    """Writes data in a bz2 file, compressing it in parallel.
+
+    Args:
+        filename (str): path to the bz2 file.
+        data (bytes): uncompressed data.
+        max_workers (int, optional): number of threads. Defaults to None
+        (number of processors).
+        compresslevel (int, optional): bz2 compression level. Defaults to 9.
+    """
+    with open(filename, 'wb') as f:
+        f.write(compress_bz2(
+            data, max_workers=max_workers, compresslevel=compresslevel,
+        ))
+
+
+def benchmark_bz2(filename: str = TEST_DATA_PATH, max_workers: int = None) \
+        -> dict:
+    """Compares the decompression throughput of the `bz2` module and of the
+    parallel decompression on a bz2 file.
+
+    Args:
+        filename (str, optional): path to the bz2 file.
+        Defaults to TEST_DATA_PATH.
+        max_workers (int, optional): number of threads. Defaults to None
+        (number of processors).
+
+    Returns:
+        dict: uncompressed size and throughputs in MB/s.
+    """
+    start = time.perf_counter()
+    with bz2.open(filename, 'rb') as f:
+        lines_stdlib = f.read().split(b'\n')
+    time_stdlib = time.perf_counter() - start
+
+    start = time.perf_counter()
+    lines_parallel = read_lines_bz2(filename, max_workers)
+    time_parallel = time.perf_counter() - start
+
+    # Same lines in the same order
+    if lines_stdlib and not lines_stdlib[-1]:
+        lines_stdlib.pop()
+    assert lines_stdlib == lines_parallel
+
+    size = sum(map(len, lines_parallel)) + len(lines_parallel)
+    return {
+        'size (MB)': size / 1e6,
+        'stdlib (MB/s)': size / 1e6 / time_stdlib,
+        'parallel (MB/s)': size / 1e6 / time_parallel,
+        'speedup': time_stdlib / time_parallel,
+    }
+
+
+if __name__ == '__main__':
+    for key, value in benchmark_bz2().items():
+        print(f'{key}: {value:.2f}')
@@ -4,17 +4,39 @@ All constants.
 # Column names in dataframes
 BOW_COL = 'bow'
 COMPOUND_SCORE_COL = 'compound_score'
+LABEL_COL = 'label'
+NEG_SCORE_COL = 'neg_score'
+NEU_SCORE_COL = 'neu_score'
+NEWSPAPER_COL = 'newspaper'
 PARTY_NAME_COL = 'party_name'
+POS_SCORE_COL = 'pos_score'
 QID_COL = 'qid'
 QIDS_COL = 'qids'
+QUOTE_ID_COL = 'quoteID'
+QUOTE_KEY_COL = 'quote_key'
 QUOTATION_COL = 'quotation'
 SPEAKER_COL = 'speaker'
 TOKENS_COL = 'tokens'
 TOPICS_COL = 'topics'
+YEAR_COL = 'year'
+
+# Columns of the VADER polarity scores
+POLARITY_SCORE_COLS = {
+    'neg': NEG_SCORE_COL,
+    'neu': NEU_SCORE_COL,
+    'pos': POS_SCORE_COL,
+    'compound': COMPOUND_SCORE_COL,
+}
 
 # Useless columns
 USELESS_COLS = ['phase', 'probas', 'urls']
 
+# Columns converted to categories to save memory
+CATEGORY_COLS = [SPEAKER_COL, QID_COL, PARTY_NAME_COL, LABEL_COL]
+
+# Columns of quotes to keep in parquet files
+QUOTE_COLUMNS = ['quotation', 'speaker', 'qids', 'date', 'numOccurrences']
+
 # Columns to keep in parquet files
 SPEAKER_COLUMNS = [
     'aliases', 'id', 'nationality', 'US_congress_bio_ID', 'party', 'label'
@@ -175,3 +197,10 @@ TOPICS = [
     'tax',
     'coal',
 ]
+
+# Dictionnary of newspapers and domains
+NEWSPAPER_DOMAIN = {
+    'CNN': '.cnn',
+    'FOX': '.fox',
+    'NYT': '.nytimes.com',
+}
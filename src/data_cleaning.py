@@ -2,12 +2,10 @@
 Functions to clean data.
 """
 import pandas as pd
-from tqdm import tqdm
 
-from .constants import TOKENS_COL, USELESS_COLS
-
-# Init progress bar
-tqdm.pandas()
+from . import token_store
+from .constants import CATEGORY_COLS, QUOTATION_COL, TOKENS_COL, USELESS_COLS
+from .token_store import TokenStore, create_token_store, get_tokens_series
 
 
 def drop_useless_columns(
@@ -49,37 +47,107 @@ def remove_abnormalities(df: pd.DataFrame, verbose: bool = False) -> None:
         print('No missing entries')
 
 
-def convert_columns_type(df: pd.DataFrame, verbose: bool = False) -> None:
+def get_memory_usage(df: pd.DataFrame) -> int:
+    """Returns the memory usage of a dataframe, including the objects.
+
+    Args:
+        df (pd.DataFrame): dataframe.
+
+    Returns:
+        int: memory usage in bytes.
+    """
+    return df.memory_usage(deep=True).sum()
+
+
+def optimize_columns_type(df: pd.DataFrame) -> None:
+    """Converts the columns of a dataframe to memory efficient types:
+
+    - Speakers, QIDs, parties and labels into categories
+    - Quotations into Arrow-backed strings
+    - Number of occurrences into the smallest integer type
+
+    Args:
+        df (pd.DataFrame): dataframe.
+    """
+    for col in CATEGORY_COLS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+
+    if QUOTATION_COL in df.columns:
+        df[QUOTATION_COL] = df[QUOTATION_COL].astype('string[pyarrow]')
+
+    if 'numOccurrences' in df.columns:
+        df['numOccurrences'] = pd.to_numeric(
+            df['numOccurrences'], downcast='unsigned'
+        )
+
+
+def convert_columns_type(
+    df: pd.DataFrame,
+    verbose: bool = False,
+    optimize: bool = False,
+) -> None:
     """Converts columns types.
 
     Args:
         df (pd.DataFrame): dataframe.
-        verbose (bool, optional): True to show old and new types.
-        Defaults to False.
+        verbose (bool, optional): True to show old and new types, and the
+        memory usage in optimize mode. Defaults to False.
+        optimize (bool, optional): True to convert the columns to memory
+        efficient types. Defaults to False.
     """
     # Print old types
     if verbose:
         print('Old types:')
         print(df.dtypes)
+    memory_before = get_memory_usage(df) if verbose and optimize else None
 
     # Change the types to the appropriate ones
-    df = df.convert_dtypes()
+    df_converted = df.convert_dtypes()
+    for col in df.columns:
+        df[col] = df_converted[col]
+    del df_converted
 
     # Change type of date into datetime type
     if 'date' in df.columns:
         df['date'] = pd.to_datetime(df['date'])
 
+    if optimize:
+        optimize_columns_type(df)
+
     # Print new types
     if verbose:
         print('\nNew types:')
         print(df.dtypes)
 
+    # Print memory usage
+    if memory_before is not None:
+        memory_after = get_memory_usage(df)
+        print('\nMemory usage:')
+        print(f'Before: {memory_before / 1e6:.1f} MB')
+        print(f'After: {memory_after / 1e6:.1f} MB')
+        print(f'Ratio: {memory_before / memory_after:.1f}x lower')
+
 
-def drop_pron_tokens(df: pd.DataFrame) -> None:
-    """Drops the -PRON- from the tokens column of a dataframe.
+def drop_pron_tokens(
+    df: pd.DataFrame,
+    store: TokenStore = None,
+) -> TokenStore:
+    """Drops the -PRON- from the tokens column of a dataframe. The tokens are
+    filtered in a token store, which is returned to be reused by the other
+    functions on tokens (topics, dictionary, Bag-of-words, wordclouds).
 
     Args:
         df (pd.DataFrame): dataframe.
+        store (TokenStore, optional): token store of the quotes, with the
+        same index. Defaults to None (created from the `tokens` column).
+
+    Returns:
+        TokenStore: token store without -PRON-.
     """
-    df[TOKENS_COL] = df[TOKENS_COL].progress_apply(
-        lambda x: [token for token in x if token != '-PRON-'])
+    if store is None:
+        store = create_token_store(df[TOKENS_COL])
+
+    store = token_store.drop_pron_tokens(store)
+    df[TOKENS_COL] = get_tokens_series(store)
+    return store
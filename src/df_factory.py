@@ -4,38 +4,322 @@ Functions to create dataframes.
 import bz2
 import json
 import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as pa_ipc
+import pyarrow.json as pa_json
 from tqdm import tqdm
 
-from .constants import QID_COL, QIDS_COL, QUOTATION_COL, SPEAKER_COL
+from .bz2_parallel import (iter_decompress_bz2, iter_lines_bz2,
+                           read_lines_bz2, write_bz2)
+from .constants import (QID_COL, QIDS_COL, QUOTATION_COL, QUOTE_ID_COL,
+                        SPEAKER_COL, TOKENS_COL)
 from .paths import TEST_DATA_PATH
+from .quote_index import set_quote_keys
 
 pd.options.mode.chained_assignment = None
 
+# Default number of lines per chunk when streaming bz2 files
+CHUNKSIZE = 100_000
+
+# Types of the fields of the json files (quotes and tokens)
+JSON_SCHEMA = {
+    QUOTE_ID_COL: pa.string(),
+    QUOTATION_COL: pa.string(),
+    SPEAKER_COL: pa.string(),
+    QIDS_COL: pa.list_(pa.string()),
+    'date': pa.string(),
+    'numOccurrences': pa.int64(),
+    'probas': pa.list_(pa.list_(pa.string())),
+    'urls': pa.list_(pa.string()),
+    'phase': pa.string(),
+    TOKENS_COL: pa.list_(pa.string()),
+}
+
 # Init progress bar
 tqdm.pandas()
 
 
-def create_df_from_bz2(filename: str) -> pd.DataFrame:
+def get_json_parse_options(columns: list) -> pa_json.ParseOptions:
+    """Returns the options to parse only some columns of json lines with
+    pyarrow. The other fields are skipped by the parser.
+
+    Args:
+        columns (list): names of the columns to keep.
+
+    Raises:
+        ValueError: if a column is not a field of the json files.
+
+    Returns:
+        pa_json.ParseOptions: parse options.
+    """
+    unknown_columns = set(columns) - set(JSON_SCHEMA)
+    if unknown_columns:
+        raise ValueError(f'Unknown columns: {sorted(unknown_columns)}')
+
+    # Always keep the quote ID to set the index
+    fields = [QUOTE_ID_COL]
+    fields += [col for col in columns if col != QUOTE_ID_COL]
+    schema = pa.schema([(col, JSON_SCHEMA[col]) for col in fields])
+    return pa_json.ParseOptions(
+        explicit_schema=schema, unexpected_field_behavior='ignore',
+    )
+
+
+def get_arrow_list_dtype(arrow_type: pa.DataType) -> pd.ArrowDtype:
+    """Returns the type of the Arrow-backed list columns, to be used as types
+    mapper of `pa.Table.to_pandas`.
+
+    Args:
+        arrow_type (pa.DataType): pyarrow type of a column.
+
+    Returns:
+        pd.ArrowDtype: Arrow type for a list column, None otherwise (default
+        conversion).
+    """
+    if pa.types.is_list(arrow_type):
+        return pd.ArrowDtype(arrow_type)
+    return None
+
+
+def set_arrow_list_columns(df: pd.DataFrame) -> None:
+    """Converts the list columns of a dataframe of python lists to
+    Arrow-backed lists.
+
+    Args:
+        df (pd.DataFrame): dataframe created from json lines.
+    """
+    for col, arrow_type in JSON_SCHEMA.items():
+        if col in df.columns and pa.types.is_list(arrow_type):
+            df[col] = df[col].astype(pd.ArrowDtype(arrow_type))
+
+
+def create_df_from_arrow(
+    table: pa.Table,
+    arrow_lists: bool = False,
+) -> pd.DataFrame:
+    """Creates a dataframe indexed by quote ID from a pyarrow table.
+
+    The list columns are converted to python lists, like with `json.loads`,
+    or kept in the Arrow buffers without creating any python object.
+
+    Args:
+        table (pa.Table): pyarrow table with a `quoteID` column.
+        arrow_lists (bool, optional): True to keep the list columns
+        Arrow-backed (`pd.ArrowDtype`). Defaults to False.
+
+    Returns:
+        pd.DataFrame: dataframe.
+    """
+    if arrow_lists:
+        df = table.to_pandas(types_mapper=get_arrow_list_dtype)
+        df.set_index(QUOTE_ID_COL, inplace=True)
+        return df
+
+    list_columns = [
+        field.name for field in table.schema if pa.types.is_list(field.type)
+    ]
+    df = table.select([
+        col for col in table.column_names if col not in list_columns
+    ]).to_pandas()
+    for col in list_columns:
+        df[col] = pd.Series(
+            table.column(col).to_pylist(), index=df.index, dtype=object
+        )
+    df = df[table.column_names]
+    df.set_index(QUOTE_ID_COL, inplace=True)
+    return df
+
+
+def create_df_from_json_arrow(
+    source,
+    columns: list,
+    arrow_lists: bool = False,
+) -> pd.DataFrame:
+    """Creates a dataframe from json lines parsed by pyarrow, keeping only
+    some columns. An empty input gives an empty dataframe with the same
+    columns and types.
+
+    Args:
+        source: json lines (file path, file object or pyarrow stream).
+        columns (list): names of the columns to keep.
+        arrow_lists (bool, optional): True to keep the list columns
+        Arrow-backed (`pd.ArrowDtype`). Defaults to False.
+
+    Returns:
+        pd.DataFrame: dataframe.
+    """
+    parse_options = get_json_parse_options(columns)
+    try:
+        table = pa_json.read_json(source, parse_options=parse_options)
+    except pa.ArrowInvalid as error:
+        # pyarrow rejects an input without any byte (empty newspaper file)
+        if 'Empty JSON file' not in str(error):
+            raise
+        table = parse_options.explicit_schema.empty_table()
+    df = create_df_from_arrow(table, arrow_lists)
+    assert df.index.is_unique  # check if index is unique
+    return df
+
+
+def create_df_from_lines(lines: list, columns: list = None) -> pd.DataFrame:
+    """Creates a dataframe from json lines.
+
+    Args:
+        lines (list): json lines.
+        columns (list, optional): names of the columns to keep. The other
+        fields are never parsed. Defaults to None (all the columns).
+
+    Returns:
+        pd.DataFrame: dataframe.
+    """
+    if columns is not None:
+        data = b'\n'.join(line.rstrip(b'\n') for line in lines)
+        return create_df_from_json_arrow(pa.BufferReader(data), columns)
+
+    df = pd.DataFrame(map(json.loads, lines))
+    if QUOTE_ID_COL in df.columns:
+        df.set_index(QUOTE_ID_COL, inplace=True)
+    assert df.index.is_unique  # check if index is unique
+    return df
+
+
+def iter_lines_from_bz2(filename: str, parallel: bool = False):
+    """Yields the lines of a bz2 file.
+
+    Args:
+        filename (str): path to the bz2 file.
+        parallel (bool, optional): True to decompress the bz2 blocks in
+        parallel. Defaults to False.
+
+    Yields:
+        bytes: line.
+    """
+    if parallel:
+        yield from iter_lines_bz2(filename)
+    else:
+        with bz2.open(filename, 'rb') as f:
+            yield from f
+
+
+def create_df_from_bz2(
+    filename: str,
+    parallel: bool = False,
+    columns: list = None,
+    arrow_lists: bool = False,
+) -> pd.DataFrame:
     """Creates a dataframe from a bz2 file.
 
     Args:
         filename (str): path to the bz2 file.
+        parallel (bool, optional): True to decompress the bz2 blocks in
+        parallel. Defaults to False.
+        columns (list, optional): names of the columns to keep. The other
+        fields are never parsed. Defaults to None (all the columns).
+        arrow_lists (bool, optional): True to have Arrow-backed list columns
+        (`pd.ArrowDtype`). Defaults to False.
 
     Returns:
         pd.DataFrame: dataframe.
     """
-    with bz2.open(filename, 'rb') as f:
-        data = f.readlines()
-    data = list(map(json.loads, data))
-    df = pd.DataFrame(data)
-    if 'quoteID' in df.columns:
-        df.set_index('quoteID', inplace=True)
-    assert df.index.is_unique  # check if index is unique
+    if columns is not None:
+        if parallel:
+            source = pa.py_buffer(b''.join(iter_decompress_bz2(filename)))
+            source = pa.BufferReader(source)
+        else:
+            source = pa.input_stream(filename, compression='bz2')
+        return create_df_from_json_arrow(source, columns, arrow_lists)
+
+    if parallel:
+        data = read_lines_bz2(filename)
+    else:
+        with bz2.open(filename, 'rb') as f:
+            data = f.readlines()
+    df = create_df_from_lines(data)
+    if arrow_lists:
+        set_arrow_list_columns(df)
     return df
 
 
+def iter_df_from_bz2(
+    filename: str,
+    chunksize: int = CHUNKSIZE,
+    parallel: bool = False,
+    columns: list = None,
+):
+    """Yields dataframes of at most `chunksize` rows from a bz2 file, without
+    loading the whole file in memory.
+
+    Args:
+        filename (str): path to the bz2 file.
+        chunksize (int, optional): number of rows per dataframe.
+        Defaults to CHUNKSIZE.
+        parallel (bool, optional): True to decompress the bz2 blocks in
+        parallel. Defaults to False.
+        columns (list, optional): names of the columns to keep. The other
+        fields are never parsed. Defaults to None (all the columns).
+
+    Yields:
+        pd.DataFrame: dataframe of a chunk of rows.
+    """
+    lines = list()
+    for line in iter_lines_from_bz2(filename, parallel):
+        lines.append(line)
+        if len(lines) == chunksize:
+            yield create_df_from_lines(lines, columns)
+            lines = list()
+    if lines:
+        yield create_df_from_lines(lines, columns)
+
+
+def get_json_columns(filename: str) -> list:
+    """Returns the fields of the first line of a bz2 file of json lines that
+    are in `JSON_SCHEMA`, in the order of the line.
+
+    Args:
+        filename (str): path to the bz2 file.
+
+    Returns:
+        list: names of the columns (empty for an empty file).
+    """
+    with bz2.open(filename, 'rb') as f:
+        line = f.readline()
+    if not line.strip():
+        return list()
+    return [col for col in json.loads(line) if col in JSON_SCHEMA]
+
+
+def create_df_from_bz2_arrow(
+    filename: str,
+    parallel: bool = False,
+    columns: list = None,
+    arrow_lists: bool = False,
+) -> pd.DataFrame:
+    """Creates a dataframe from a bz2 file, always parsed by pyarrow. Without
+    columns, the fields of the first line in `JSON_SCHEMA` are kept, instead
+    of parsing the lines with `json.loads` as `create_df_from_bz2` does.
+
+    Args:
+        filename (str): path to the bz2 file.
+        parallel (bool, optional): True to decompress the bz2 blocks in
+        parallel. Defaults to False.
+        columns (list, optional): names of the columns to keep.
+        Defaults to None (fields of the first line).
+        arrow_lists (bool, optional): True to have Arrow-backed list columns
+        (`pd.ArrowDtype`). Defaults to False.
+
+    Returns:
+        pd.DataFrame: dataframe.
+    """
+    if columns is None:
+        columns = get_json_columns(filename)
+    return create_df_from_bz2(filename, parallel, columns, arrow_lists)
+
+
 def create_df_test() -> pd.DataFrame:
     """Creates the dataframe from the test dataset of quotes from the NYT.
 
@@ -45,29 +329,249 @@ def create_df_test() -> pd.DataFrame:
     return create_df_from_bz2(TEST_DATA_PATH)
 
 
-def create_df_from_bz2_dir(dirname: str) -> pd.DataFrame:
+def merge_sorted_runs(run_a: tuple, run_b: tuple) -> tuple:
+    """Merges two sorted runs of keys with their row positions. For equal
+    keys, the rows of the first run come first.
+
+    Args:
+        run_a (tuple): sorted keys, row positions.
+        run_b (tuple): sorted keys, row positions.
+
+    Returns:
+        tuple: merged sorted keys, row positions.
+    """
+    keys_a, positions_a = run_a
+    keys_b, positions_b = run_b
+
+    # Runs that do not overlap are concatenated
+    if len(keys_a) == 0 or len(keys_b) == 0 or keys_a[-1] <= keys_b[0]:
+        return (
+            np.concatenate([keys_a, keys_b]),
+            np.concatenate([positions_a, positions_b]),
+        )
+    if keys_b[-1] < keys_a[0]:
+        return (
+            np.concatenate([keys_b, keys_a]),
+            np.concatenate([positions_b, positions_a]),
+        )
+
+    # Positions of the keys of b in the merged run
+    merged_b = np.searchsorted(keys_a, keys_b, side='right')
+    merged_b += np.arange(len(keys_b))
+    mask_a = np.ones(len(keys_a) + len(keys_b), dtype=bool)
+    mask_a[merged_b] = False
+
+    keys = np.empty(len(mask_a), dtype=keys_a.dtype)
+    keys[merged_b] = keys_b
+    keys[mask_a] = keys_a
+    positions = np.empty(len(mask_a), dtype=positions_a.dtype)
+    positions[merged_b] = positions_b
+    positions[mask_a] = positions_a
+    return keys, positions
+
+
+def concat_sorted_dfs(dfs: list) -> pd.DataFrame:
+    """Concatenates dataframes sorted by index into a dataframe sorted by
+    index, with a k-way merge of the indexes instead of a global sort.
+
+    Args:
+        dfs (list): dataframes (an unsorted dataframe is sorted first).
+
+    Returns:
+        pd.DataFrame: concatenated dataframe sorted by index.
+    """
+    dfs = [
+        df if df.index.is_monotonic_increasing else df.sort_index()
+        for df in dfs
+    ]
+
+    # Runs of keys and row positions in the concatenation
+    runs = list()
+    offset = 0
+    for df in dfs:
+        runs.append((
+            df.index.to_numpy(dtype=object),
+            np.arange(offset, offset + len(df)),
+        ))
+        offset += len(df)
+
+    # Merge the runs two by two
+    while len(runs) > 1:
+        merged_runs = [
+            merge_sorted_runs(runs[i], runs[i + 1])
+            for i in range(0, len(runs) - 1, 2)
+        ]
+        if len(runs) % 2:
+            merged_runs.append(runs[-1])
+        runs = merged_runs
+
+    df_concat = pd.concat(dfs)
+    if runs and not np.array_equal(runs[0][1], np.arange(len(df_concat))):
+        df_concat = df_concat.take(runs[0][1])
+    return df_concat
+
+
+def save_bz2_as_arrow(
+    filename: str,
+    arrow_filename: str,
+    parallel: bool = False,
+    columns: list = None,
+) -> str:
+    """Loads a bz2 file with pyarrow and saves it in the Arrow IPC format, to
+    be memory mapped by another process without pickling. The list columns
+    stay in Arrow, so that no python object is created in the worker.
+
+    Args:
+        filename (str): path to the bz2 file.
+        arrow_filename (str): path to the Arrow IPC file.
+        parallel (bool, optional): True to decompress the bz2 blocks in
+        parallel. Defaults to False.
+        columns (list, optional): names of the columns to keep.
+        Defaults to None (fields of the first line, see
+        `create_df_from_bz2_arrow`).
+
+    Returns:
+        str: path to the Arrow IPC file.
+    """
+    df = create_df_from_bz2_arrow(
+        filename, parallel, columns, arrow_lists=True
+    )
+
+    # An empty file has no named index
+    df = df.rename_axis(QUOTE_ID_COL).reset_index()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pa_ipc.new_file(arrow_filename, table.schema) as writer:
+        writer.write_table(table)
+    return arrow_filename
+
+
+def create_df_from_arrow_file(
+    arrow_filename: str,
+    arrow_lists: bool = False,
+) -> pd.DataFrame:
+    """Creates a dataframe from a memory mapped Arrow IPC file.
+
+    Args:
+        arrow_filename (str): path to the Arrow IPC file.
+        arrow_lists (bool, optional): True to keep the list columns
+        Arrow-backed (`pd.ArrowDtype`). Defaults to False.
+
+    Returns:
+        pd.DataFrame: dataframe.
+    """
+    with pa.memory_map(arrow_filename, 'r') as source:
+        table = pa_ipc.open_file(source).read_all()
+    return create_df_from_arrow(table, arrow_lists)
+
+
+def create_df_from_bz2_dir(
+    dirname: str,
+    parallel: bool = False,
+    columns: list = None,
+    max_workers: int = 1,
+    quote_index: pd.Index = None,
+    arrow_lists: bool = False,
+) -> pd.DataFrame:
     """Creates a dataframe from a directory containing bz2 files.
 
+    With several workers, the files are parsed by pyarrow in a process pool
+    (without columns, the fields of the first line of each file in
+    `JSON_SCHEMA` are kept). The list columns (qids, urls, tokens...) are
+    converted to python lists by the workers, or with `arrow_lists` stay in
+    the Arrow buffers and are sent back through memory mapped Arrow IPC
+    files (a row is then a numpy array in `apply`, and `create_token_store`
+    reads the tokens without python objects). The files are sorted by quote
+    ID, so they are merged instead of sorted again.
+
     Args:
         dirname (str): path to the directory.
+        parallel (bool, optional): True to decompress the bz2 blocks in
+        parallel. Defaults to False.
+        columns (list, optional): names of the columns to keep. The other
+        fields are never parsed. Defaults to None (all the columns).
+        max_workers (int, optional): number of processes loading the files.
+        None for the number of processors. Defaults to 1.
+        quote_index (pd.Index, optional): quote index to index the dataframe
+        by int64 keys. Defaults to None (indexed by quote ID).
+        arrow_lists (bool, optional): True to have Arrow-backed list columns
+        (`pd.ArrowDtype`). Defaults to False.
 
     Returns:
         pd.DataFrame: dataframe.
     """
-    dfs = list()
-    filenames = os.listdir(dirname)
-    for filename in tqdm(filenames, desc='Load bz2 files', unit='file'):
-        path = os.path.join(dirname, filename)
-        df = create_df_from_bz2(path)
-        dfs.append(df)
+    filenames = sorted(os.listdir(dirname))
+    if max_workers == 1:
+        dfs = list()
+        for filename in tqdm(filenames, desc='Load bz2 files', unit='file'):
+            path = os.path.join(dirname, filename)
+            df = create_df_from_bz2(path, parallel, columns, arrow_lists)
+            dfs.append(df)
+        df_concat = concat_sorted_dfs(dfs)
+        if quote_index is not None:
+            set_quote_keys(df_concat, quote_index)
+        return df_concat
+
+    with tempfile.TemporaryDirectory() as tmp_dir, \
+            ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = dict()
+        for i, filename in enumerate(filenames):
+            path = os.path.join(dirname, filename)
+            if arrow_lists:
+                arrow_filename = os.path.join(tmp_dir, f'{i}.arrow')
+                future = executor.submit(
+                    save_bz2_as_arrow, path, arrow_filename, parallel, columns
+                )
+            else:
+                future = executor.submit(
+                    create_df_from_bz2_arrow, path, parallel, columns
+                )
+            futures[future] = i
+        dfs = [None] * len(filenames)
+        for future in tqdm(
+            as_completed(futures),
+            total=len(futures),
+            desc='Load bz2 files',
+            unit='file',
+        ):
+            result = future.result()
+            if arrow_lists:
+                result = create_df_from_arrow_file(result, arrow_lists=True)
+            dfs[futures[future]] = result
+
+    df_concat = concat_sorted_dfs(dfs)
+    if quote_index is not None:
+        set_quote_keys(df_concat, quote_index)
+    return df_concat
 
-    # Concatenate the dataframes
-    df_concat = pd.concat(dfs)
 
-    # Sort index
-    df_concat.sort_index(inplace=True)
+def iter_df_from_bz2_dir(
+    dirname: str,
+    chunksize: int = CHUNKSIZE,
+    parallel: bool = False,
+    columns: list = None,
+):
+    """Yields dataframes of at most `chunksize` rows from a directory
+    containing bz2 files, without loading the whole directory in memory.
 
-    return df_concat
+    The files are read in the order of their names. Unlike
+    `create_df_from_bz2_dir`, the rows are not sorted across the files.
+
+    Args:
+        dirname (str): path to the directory.
+        chunksize (int, optional): number of rows per dataframe.
+        Defaults to CHUNKSIZE.
+        parallel (bool, optional): True to decompress the bz2 blocks in
+        parallel. Defaults to False.
+        columns (list, optional): names of the columns to keep. The other
+        fields are never parsed. Defaults to None (all the columns).
+
+    Yields:
+        pd.DataFrame: dataframe of a chunk of rows.
+    """
+    filenames = sorted(os.listdir(dirname))
+    for filename in tqdm(filenames, desc='Stream bz2 files', unit='file'):
+        path = os.path.join(dirname, filename)
+        yield from iter_df_from_bz2(path, chunksize, parallel, columns)
 
 
 def create_df_unique_speakers(df: pd.DataFrame) -> pd.DataFrame:
@@ -105,7 +609,7 @@ def create_df_speaker(df: pd.DataFrame, qid: str) -> pd.DataFrame:
     if QID_COL in df.columns:
         return df[df[QID_COL] == qid]
 
-    mask = df.qids.progress_apply(lambda x: x != [] and qid == x[0])
+    mask = df.qids.progress_apply(lambda x: len(x) > 0 and qid == x[0])
     return df[mask]
 
 
@@ -115,7 +619,9 @@ def add_col_qid(df: pd.DataFrame) -> None:
     Args:
         df (pd.DataFrame): dataframe.
     """
-    df[QID_COL] = df.qids.progress_apply(lambda x: x[0] if x else None)
+    df[QID_COL] = df.qids.progress_apply(
+        lambda x: x[0] if len(x) else None
+    )
 
 
 def create_df_joined_quotes(df: pd.DataFrame) -> pd.DataFrame:
@@ -132,31 +638,51 @@ def create_df_joined_quotes(df: pd.DataFrame) -> pd.DataFrame:
         add_col_qid(df)
 
     # Group by qid and join quotes
-    return df.groupby(QID_COL, as_index=False)[QUOTATION_COL].progress_apply(
+    return df.groupby(
+        QID_COL, as_index=False, observed=True
+    )[QUOTATION_COL].progress_apply(
         lambda x: ' '.join(x)
     )
 
 
-def save_df_bz2(df: pd.DataFrame, filename: str) -> None:
+def save_df_bz2(
+    df: pd.DataFrame,
+    filename: str,
+    parallel: bool = False,
+) -> None:
     """Saves a dataframe in a bz2 file.
 
     Args:
         df (pd.DataFrame): dataframe.
         filename (str): bz2 file path.
+        parallel (bool, optional): True to compress the file in parallel
+        (multi-stream bz2 file). Defaults to False.
     """
-    df.to_json(filename, orient='records', lines=True, compression='bz2')
-
-
-def add_col_tokens_from_bz2(df: pd.DataFrame, filename: str) -> pd.DataFrame:
+    if parallel:
+        data = df.to_json(orient='records', lines=True)
+        write_bz2(filename, data.encode('utf-8'))
+    else:
+        df.to_json(filename, orient='records', lines=True, compression='bz2')
+
+
+def add_col_tokens_from_bz2(
+    df: pd.DataFrame,
+    filename: str,
+    quote_index: pd.Index = None,
+) -> pd.DataFrame:
     """Adds the column of tokens to a dataframe of quotes from a filename
     containing the tokens.
 
     Args:
         df (pd.DataFrame): dataframe.
         filename (str): bz2 file with the tokens.
+        quote_index (pd.Index, optional): quote index if the dataframe is
+        indexed by int64 keys. Defaults to None (indexed by quote ID).
 
     Returns:
         pd.Dataframe: dataframe with tokens column.
     """
     df_tokens = create_df_from_bz2(filename)
+    if quote_index is not None:
+        set_quote_keys(df_tokens, quote_index, drop_unknown=True)
     return df.merge(df_tokens, how='left', left_index=True, right_index=True)
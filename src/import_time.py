@@ -0,0 +1,150 @@
+"""
+Import time benchmark of the src modules.
+
+The modules must not load models or access the network when they are
+imported: the spaCy pipeline, the sentiment analyzer, gensim, Empath and
+scikit-learn are loaded on first use. Each module is imported in a new
+interpreter with `python -X importtime`, which also guards against these
+imports coming back.
+
+To run the benchmark:
+python3 -m src.import_time
+"""
+import subprocess
+import sys
+
+import pandas as pd
+
+from .paths import ROOT_DIR
+
+# Modules of the package
+SRC_MODULES = [
+    'src.bz2_parallel',
+    'src.constants',
+    'src.data_cleaning',
+    'src.data_loader',
+    'src.df_factory',
+    'src.parquet_files',
+    'src.paths',
+    'src.plot_utils',
+    'src.quote_index',
+    'src.quotebank_router',
+    'src.sentiment_analysis',
+    'src.table_utils',
+    'src.text_cache',
+    'src.text_processing',
+    'src.token_store',
+    'src.wordcloud',
+]
+
+# Packages only imported on first use
+LAZY_PACKAGES = [
+    'empath', 'en_core_web_sm', 'gensim', 'nltk', 'sklearn', 'spacy',
+]
+
+# Maximum import time of a module in seconds
+MAX_IMPORT_SECONDS = 1.5
+
+
+def get_import_times(module: str) -> dict:
+    """Returns the cumulative import time of a module and of all the modules
+    it imports, in a new interpreter.
+
+    Args:
+        module (str): name of the module.
+
+    Raises:
+        ImportError: if the module cannot be imported.
+
+    Returns:
+        dict: import time in seconds by imported module.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        errors = [
+            line for line in result.stderr.splitlines()
+            if line and not line.startswith('import time:')
+        ]
+        raise ImportError(errors[-1] if errors else f'Cannot import {module}')
+
+    # Lines 'import time: self [us] | cumulative | imported package'
+    import_times = dict()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if cumulative.strip().isdigit():
+            import_times[name.strip()] = int(cumulative) / 1e6
+    return import_times
+
+
+def check_import(
+    module: str,
+    max_seconds: float = MAX_IMPORT_SECONDS,
+) -> float:
+    """Checks that a module does not import the lazy packages, and that its
+    import is fast enough.
+
+    Args:
+        module (str): name of the module.
+        max_seconds (float, optional): maximum import time in seconds. None
+        to not check it. Defaults to MAX_IMPORT_SECONDS.
+
+    Raises:
+        ImportError: if the module cannot be imported.
+        AssertionError: if a lazy package is imported or the import is too
+        slow.
+
+    Returns:
+        float: import time in seconds.
+    """
+    import_times = get_import_times(module)
+    lazy_packages = [
+        package for package in LAZY_PACKAGES if package in import_times
+    ]
+    assert not lazy_packages, f'{module} imports {lazy_packages}'
+
+    seconds = import_times[module]
+    if max_seconds is not None:
+        assert seconds <= max_seconds, f'{module} imported in {seconds:.2f}s'
+    return seconds
+
+
+def benchmark_import_time(
+    modules: list = SRC_MODULES,
+    max_seconds: float = MAX_IMPORT_SECONDS,
+) -> pd.DataFrame:
+    """Returns the import time of modules, each in a new interpreter. A
+    module that cannot be imported, imports a lazy package or is too slow to
+    import is reported with its error instead of stopping the benchmark.
+
+    Args:
+        modules (list, optional): names of the modules.
+        Defaults to SRC_MODULES.
+        max_seconds (float, optional): maximum import time in seconds. None
+        to not check it. Defaults to MAX_IMPORT_SECONDS.
+
+    Returns:
+        pd.DataFrame: import time in seconds (NaN on error) and error of
+        each module.
+    """
+    results = list()
+    for module in modules:
+        try:
+            seconds = check_import(module, max_seconds)
+            error = None
+        except (AssertionError, ImportError) as e:
+            seconds = float('nan')
+            error = str(e)
+        results.append({'module': module, 'seconds': seconds, 'error': error})
+
+    return pd.DataFrame(results)
+
+
+if __name__ == '__main__':
+    print(benchmark_import_time().to_string(index=False))
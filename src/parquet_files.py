@@ -1,10 +1,36 @@
 """
 Functions to manage parquet files.
 """
+import operator
+import os
+import shutil
+from functools import reduce
+
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 from tqdm import tqdm
 
-from .constants import QID, QID_COL, SPEAKER_COLUMNS
+from .constants import (NEWSPAPER_COL, NEWSPAPER_DOMAIN, QID, QID_COL,
+                        QIDS_COL, QUOTE_COLUMNS, QUOTE_ID_COL,
+                        SPEAKER_COLUMNS, TOKENS_COL, YEAR_COL)
+from .df_factory import (CHUNKSIZE, JSON_SCHEMA, create_df_from_arrow,
+                         iter_df_from_bz2)
+from .paths import DATA_DIR, QUOTES_DATASET_DIR, TOKENS_DATASET_DIR, TOKENS_DIR
+from .quote_index import set_quote_keys
+
+# Partitions of the datasets of quotes and tokens
+PARTITION_COLS = [NEWSPAPER_COL, YEAR_COL]
+
+# Types of the columns of the datasets of quotes and tokens
+DATASET_SCHEMA = {
+    **JSON_SCHEMA,
+    QID_COL: pa.string(),
+    'date': pa.timestamp('us'),
+    NEWSPAPER_COL: pa.string(),
+    YEAR_COL: pa.int32(),
+}
 
 # Init progress bar
 tqdm.pandas()
@@ -107,3 +133,285 @@ def merge_quotes_speakers(
         pd.DataFrame: dataframe merged.
     """
     return pd.merge(df_quotes, df_speakers, left_on=QID_COL, right_index=True)
+
+
+def get_dataset_schema(columns: list) -> pa.Schema:
+    """Returns the schema of some columns of the datasets, so that all the
+    chunks have the same types, even when a column has only missing values
+    or empty lists.
+
+    Args:
+        columns (list): names of the columns.
+
+    Raises:
+        ValueError: if a column is not a column of the datasets.
+
+    Returns:
+        pa.Schema: schema.
+    """
+    unknown_columns = set(columns) - set(DATASET_SCHEMA)
+    if unknown_columns:
+        raise ValueError(f'Unknown columns: {sorted(unknown_columns)}')
+
+    return pa.schema([(col, DATASET_SCHEMA[col]) for col in columns])
+
+
+def write_partitioned_chunk(
+    df: pd.DataFrame,
+    dataset_dir: str,
+    newspaper: str,
+    chunk_id: int,
+) -> None:
+    """Writes a chunk of a newspaper in a dataset partitioned by newspaper and
+    year. The year is read from the quote ID, which starts with the date.
+
+    Args:
+        df (pd.DataFrame): dataframe indexed by quote ID.
+        dataset_dir (str): root directory of the dataset.
+        newspaper (str): name of the newspaper.
+        chunk_id (int): number of the chunk, used in the file names.
+    """
+    df = df.reset_index()
+    df[NEWSPAPER_COL] = newspaper
+    df[YEAR_COL] = df[QUOTE_ID_COL].str[:4].astype(int)
+    schema = get_dataset_schema(df.columns)
+    pq.write_to_dataset(
+        pa.Table.from_pandas(df, schema=schema, preserve_index=False),
+        dataset_dir,
+        partition_cols=PARTITION_COLS,
+        schema=schema,
+        basename_template=f'{newspaper}-{chunk_id}-{{i}}.parquet',
+    )
+
+
+def save_newspaper_parquet(
+    newspaper: str,
+    dirname: str = None,
+    tokens_filename: str = None,
+    chunksize: int = CHUNKSIZE,
+) -> None:
+    """Converts the bz2 files of quotes and tokens of a newspaper into the
+    parquet datasets partitioned by newspaper and year. The previous
+    partitions of the newspaper are replaced.
+
+    Args:
+        newspaper (str): name of the newspaper.
+        dirname (str, optional): directory of the bz2 files of quotes.
+        Defaults to None (directory of the newspaper in DATA_DIR).
+        tokens_filename (str, optional): bz2 file of tokens. Defaults to None
+        (tokens file of the newspaper in TOKENS_DIR, if it exists).
+        chunksize (int, optional): number of rows converted at once.
+        Defaults to CHUNKSIZE.
+    """
+    if dirname is None:
+        dirname = os.path.join(DATA_DIR, newspaper)
+    if tokens_filename is None:
+        tokens_filename = os.path.join(
+            TOKENS_DIR, f'{newspaper}-tokenizer.json.bz2'
+        )
+
+    # Remove previous partitions
+    for dataset_dir in (QUOTES_DATASET_DIR, TOKENS_DATASET_DIR):
+        shutil.rmtree(
+            os.path.join(dataset_dir, f'{NEWSPAPER_COL}={newspaper}'),
+            ignore_errors=True,
+        )
+
+    # Quotes with the first QID and the date as datetime
+    chunk_id = 0
+    for filename in tqdm(
+        sorted(os.listdir(dirname)), desc='Convert quotes', unit='file'
+    ):
+        for df in iter_df_from_bz2(
+            os.path.join(dirname, filename), chunksize, columns=QUOTE_COLUMNS
+        ):
+            df[QID_COL] = [qids[0] if qids else None for qids in df[QIDS_COL]]
+            df['date'] = pd.to_datetime(df['date'])
+            write_partitioned_chunk(
+                df, QUOTES_DATASET_DIR, newspaper, chunk_id
+            )
+            chunk_id += 1
+
+    # Tokens
+    if os.path.exists(tokens_filename):
+        for chunk_id, df in enumerate(tqdm(
+            iter_df_from_bz2(tokens_filename, chunksize, columns=[TOKENS_COL]),
+            desc='Convert tokens',
+            unit='chunk',
+        )):
+            write_partitioned_chunk(
+                df, TOKENS_DATASET_DIR, newspaper, chunk_id
+            )
+
+
+def save_quotes_parquet(newspapers: list = list(NEWSPAPER_DOMAIN)) -> None:
+    """Converts the bz2 files of quotes and tokens of several newspapers into
+    the parquet datasets partitioned by newspaper and year.
+
+    Args:
+        newspapers (list, optional): names of the newspapers.
+        Defaults to the newspapers of NEWSPAPER_DOMAIN.
+    """
+    for newspaper in newspapers:
+        print('Newspaper:', newspaper)
+        save_newspaper_parquet(newspaper)
+
+
+def get_dataset_filter(
+    newspapers: list = None,
+    years: list = None,
+    start_date: str = None,
+    end_date: str = None,
+    qids: list = None,
+) -> ds.Expression:
+    """Returns the filter expression of a partitioned dataset. The filters on
+    newspapers and years skip whole partitions.
+
+    Args:
+        newspapers (list, optional): newspapers to keep. Defaults to None.
+        years (list, optional): years to keep. Defaults to None.
+        start_date (str, optional): minimum date (included). Defaults to None.
+        end_date (str, optional): maximum date (excluded). Defaults to None.
+        qids (list, optional): QIDs of the speakers to keep.
+        Defaults to None.
+
+    Returns:
+        ds.Expression: filter expression, None if there is no filter.
+    """
+    conditions = list()
+    if newspapers is not None:
+        conditions.append(ds.field(NEWSPAPER_COL).isin(newspapers))
+    if years is not None:
+        conditions.append(ds.field(YEAR_COL).isin(years))
+    if start_date is not None:
+        conditions.append(ds.field('date') >= pd.Timestamp(start_date))
+    if end_date is not None:
+        conditions.append(ds.field('date') < pd.Timestamp(end_date))
+    if qids is not None:
+        conditions.append(ds.field(QID_COL).isin(qids))
+
+    if not conditions:
+        return None
+    return reduce(operator.and_, conditions)
+
+
+def create_df_from_dataset(
+    dataset_dir: str,
+    columns: list = None,
+    dataset_filter: ds.Expression = None,
+) -> pd.DataFrame:
+    """Creates a dataframe from a dataset partitioned by newspaper and year.
+
+    Args:
+        dataset_dir (str): root directory of the dataset.
+        columns (list, optional): columns to load (the quote ID is always
+        loaded). Defaults to None (all the columns).
+        dataset_filter (ds.Expression, optional): filter expression.
+        Defaults to None.
+
+    Returns:
+        pd.DataFrame: dataframe indexed by quote ID. A quote published by
+        several newspapers appears once per newspaper.
+    """
+    dataset = ds.dataset(dataset_dir, format='parquet', partitioning='hive')
+    if columns is not None:
+        columns = [QUOTE_ID_COL] + [
+            col for col in columns if col != QUOTE_ID_COL
+        ]
+    table = dataset.to_table(columns=columns, filter=dataset_filter)
+    df = create_df_from_arrow(table)
+    df.sort_index(inplace=True)
+    return df
+
+
+def iter_tokens_from_parquet(
+    newspapers: list = None,
+    years: list = None,
+    chunksize: int = CHUNKSIZE,
+):
+    """Yields the lists of tokens of the parquet dataset of tokens by chunks,
+    without loading the whole dataset in memory.
+
+    Args:
+        newspapers (list, optional): newspapers to load. Defaults to None.
+        years (list, optional): years to load. Defaults to None.
+        chunksize (int, optional): maximum number of quotes per chunk.
+        Defaults to CHUNKSIZE.
+
+    Yields:
+        list: lists of tokens of a chunk of quotes.
+    """
+    dataset = ds.dataset(
+        TOKENS_DATASET_DIR, format='parquet', partitioning='hive'
+    )
+    for batch in dataset.to_batches(
+        columns=[TOKENS_COL],
+        filter=get_dataset_filter(newspapers, years),
+        batch_size=chunksize,
+    ):
+        yield batch.column(TOKENS_COL).to_pylist()
+
+
+def create_df_quotes_from_parquet(
+    newspapers: list = None,
+    years: list = None,
+    columns: list = None,
+    start_date: str = None,
+    end_date: str = None,
+    qids: list = None,
+    quote_index: pd.Index = None,
+) -> pd.DataFrame:
+    """Creates a dataframe of quotes from the parquet dataset.
+
+    Args:
+        newspapers (list, optional): newspapers to load. Defaults to None.
+        years (list, optional): years to load. Defaults to None.
+        columns (list, optional): columns to load. Defaults to None.
+        start_date (str, optional): minimum date (included). Defaults to None.
+        end_date (str, optional): maximum date (excluded). Defaults to None.
+        qids (list, optional): QIDs of the speakers to load.
+        Defaults to None.
+        quote_index (pd.Index, optional): quote index to index the dataframe
+        by int64 keys. Defaults to None (indexed by quote ID).
+
+    Returns:
+        pd.DataFrame: dataframe of quotes.
+    """
+    dataset_filter = get_dataset_filter(
+        newspapers, years, start_date, end_date, qids
+    )
+    df = create_df_from_dataset(QUOTES_DATASET_DIR, columns, dataset_filter)
+    if quote_index is not None:
+        set_quote_keys(df, quote_index)
+    return df
+
+
+def add_col_tokens_from_parquet(
+    df: pd.DataFrame,
+    newspapers: list = None,
+    years: list = None,
+    quote_index: pd.Index = None,
+) -> pd.DataFrame:
+    """Adds the column of tokens to a dataframe of quotes from the parquet
+    dataset of tokens.
+
+    Args:
+        df (pd.DataFrame): dataframe.
+        newspapers (list, optional): newspapers to load. Defaults to None.
+        years (list, optional): years to load. Defaults to None.
+        quote_index (pd.Index, optional): quote index if the dataframe is
+        indexed by int64 keys. Defaults to None (indexed by quote ID).
+
+    Returns:
+        pd.DataFrame: dataframe with tokens column.
+    """
+    dataset_filter = get_dataset_filter(newspapers, years)
+    df_tokens = create_df_from_dataset(
+        TOKENS_DATASET_DIR, [TOKENS_COL], dataset_filter
+    )
+
+    # Same tokens for a quote published by several newspapers
+    df_tokens = df_tokens[~df_tokens.index.duplicated()]
+    if quote_index is not None:
+        set_quote_keys(df_tokens, quote_index, drop_unknown=True)
+    return df.merge(df_tokens, how='left', left_index=True, right_index=True)
@@ -26,3 +26,21 @@ FOX_TOKENS_PATH = os.path.join(TOKENS_DIR, 'FOX-tokenizer.json.bz2')
 NYT_TOKENS_PATH = os.path.join(TOKENS_DIR, 'NYT-tokenizer.json.bz2')
 
 PARQUET_PATH = os.path.join(ROOT_DIR, 'speaker_attributes.parquet')
+
+QUOTES_PARQUET_DIR = os.path.join(DATA_DIR, 'parquet')
+QUOTES_DATASET_DIR = os.path.join(QUOTES_PARQUET_DIR, 'quotes')
+TOKENS_DATASET_DIR = os.path.join(QUOTES_PARQUET_DIR, 'tokens')
+
+QUOTE_INDEX_PATH = os.path.join(DATA_DIR, 'quote_index.parquet')
+
+TOKENS_CACHE_PATH = os.path.join(TOKENS_DIR, 'tokens_cache.sqlite')
+
+LEMMA_LOOKUP_PATH = os.path.join(TOKENS_DIR, 'lemma_lookup.json')
+
+PHRASES_PATH = os.path.join(TOKENS_DIR, 'bigrams.phrases')
+
+LDA_DIR = os.path.join(DATA_DIR, 'lda')
+
+LEXICON_PATH = os.path.join(DATA_DIR, 'empath_lexicon.json')
+
+SENTIMENT_CACHE_PATH = os.path.join(DATA_DIR, 'sentiment_cache.sqlite')
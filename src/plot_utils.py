@@ -185,8 +185,9 @@ def plot_mean_sentiment_scores_per_party(
         Defaults to None.
     """
     # Compute mean and std per party
-    means_per_party = df.groupby('party_name').mean()
-    std_per_party = df.groupby('party_name').std()
+    grouped = df.groupby('party_name', observed=True)
+    means_per_party = grouped.mean()
+    std_per_party = grouped.std()
 
     # Create figure
     fig = go.Figure()
@@ -0,0 +1,140 @@
+"""
+Functions to index the quotes with integer keys.
+
+The quote IDs are long strings, slow to hash and heavy in memory. A quote
+index maps each quote ID to a dense int64 key, its position in the index:
+- key -> quote ID: `quote_index[key]`
+- quote ID -> key: `quote_index.get_indexer(quote_ids)`
+
+The index is saved in a parquet file so that the keys are the same in every
+session. New quote IDs are appended, so the existing keys never change.
+"""
+import numpy as np
+import pandas as pd
+
+from .constants import QUOTE_ID_COL, QUOTE_KEY_COL
+from .paths import QUOTE_INDEX_PATH
+
+
+def create_quote_index(quote_ids) -> pd.Index:
+    """Creates a quote index from quote IDs.
+
+    Args:
+        quote_ids: quote IDs (can contain duplicates).
+
+    Returns:
+        pd.Index: sorted unique quote IDs.
+    """
+    return pd.Index(
+        np.unique(np.asarray(quote_ids, dtype=object)), name=QUOTE_ID_COL
+    )
+
+
+def update_quote_index(quote_index: pd.Index, quote_ids) -> pd.Index:
+    """Adds new quote IDs at the end of a quote index. The keys of the
+    existing quote IDs are kept.
+
+    Args:
+        quote_index (pd.Index): quote index.
+        quote_ids: quote IDs (can contain duplicates or known IDs).
+
+    Returns:
+        pd.Index: updated quote index.
+    """
+    new_quote_ids = create_quote_index(quote_ids).difference(quote_index)
+    if new_quote_ids.empty:
+        return quote_index
+    return quote_index.append(new_quote_ids).rename(QUOTE_ID_COL)
+
+
+def save_quote_index(
+    quote_index: pd.Index,
+    filename: str = QUOTE_INDEX_PATH,
+) -> None:
+    """Saves a quote index in a parquet file.
+
+    Args:
+        quote_index (pd.Index): quote index.
+        filename (str, optional): path to the parquet file.
+        Defaults to QUOTE_INDEX_PATH.
+    """
+    pd.DataFrame({QUOTE_ID_COL: quote_index}).to_parquet(
+        filename, index=False
+    )
+
+
+def load_quote_index(filename: str = QUOTE_INDEX_PATH) -> pd.Index:
+    """Loads a quote index from a parquet file.
+
+    Args:
+        filename (str, optional): path to the parquet file.
+        Defaults to QUOTE_INDEX_PATH.
+
+    Returns:
+        pd.Index: quote index.
+    """
+    df = pd.read_parquet(filename, columns=[QUOTE_ID_COL])
+    return pd.Index(df[QUOTE_ID_COL].to_numpy(dtype=object), name=QUOTE_ID_COL)
+
+
+def get_quote_keys(quote_index: pd.Index, quote_ids) -> np.ndarray:
+    """Returns the keys of quote IDs.
+
+    Args:
+        quote_index (pd.Index): quote index.
+        quote_ids: quote IDs.
+
+    Returns:
+        np.ndarray: int64 keys, -1 for the unknown quote IDs.
+    """
+    return quote_index.get_indexer(quote_ids).astype(np.int64)
+
+
+def get_quote_ids(quote_index: pd.Index, keys) -> pd.Index:
+    """Returns the quote IDs of keys.
+
+    Args:
+        quote_index (pd.Index): quote index.
+        keys: int64 keys.
+
+    Returns:
+        pd.Index: quote IDs.
+    """
+    return quote_index.take(keys)
+
+
+def set_quote_keys(
+    df: pd.DataFrame,
+    quote_index: pd.Index,
+    drop_unknown: bool = False,
+) -> None:
+    """Replaces the quote IDs index of a dataframe by the int64 keys.
+
+    Args:
+        df (pd.DataFrame): dataframe indexed by quote ID.
+        quote_index (pd.Index): quote index.
+        drop_unknown (bool, optional): True to drop the rows whose quote ID
+        is not in the quote index. Defaults to False.
+
+    Raises:
+        KeyError: if a quote ID is not in the quote index and unknown rows
+        are not dropped.
+    """
+    keys = get_quote_keys(quote_index, df.index)
+    unknown = keys == -1
+    if unknown.any():
+        if not drop_unknown:
+            raise KeyError(f'{unknown.sum()} quote IDs not in the index')
+        df.drop(df.index[unknown], inplace=True)
+        keys = keys[~unknown]
+    df.index = pd.Index(keys, name=QUOTE_KEY_COL)
+
+
+def set_quote_ids(df: pd.DataFrame, quote_index: pd.Index) -> None:
+    """Replaces the int64 keys index of a dataframe by the quote IDs.
+
+    Args:
+        df (pd.DataFrame): dataframe indexed by key.
+        quote_index (pd.Index): quote index.
+    """
+    df.index = get_quote_ids(quote_index, df.index.to_numpy())
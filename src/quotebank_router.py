@@ -0,0 +1,158 @@
+"""
+Functions to split the raw Quotebank files per newspaper in a single pass.
+
+Each raw bz2 file is decompressed and parsed only once: every quote is routed
+to the output file of each newspaper found in its urls (a quote can be written
+in several newspapers files). The raw files are processed in parallel.
+"""
+import bz2
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from tqdm import tqdm
+
+from .constants import NEWSPAPER_DOMAIN
+from .paths import DATA_DIR, QUOTEBANK_DIR
+
+
+def get_newspapers_from_urls(
+    urls: list,
+    newspaper_domain: dict = NEWSPAPER_DOMAIN,
+) -> list:
+    """Returns the list of newspapers that published a quote from its urls.
+
+    Args:
+        urls (list): urls of the quote.
+        newspaper_domain (dict, optional): dictionary of newspapers and
+        domains. Defaults to NEWSPAPER_DOMAIN.
+
+    Returns:
+        list: names of the newspapers.
+    """
+    return [
+        newspaper for newspaper, domain in newspaper_domain.items()
+        if any(domain in url for url in urls)
+    ]
+
+
+def get_newspaper_filename(
+    newspaper: str,
+    filename: str,
+    output_dir: str = DATA_DIR,
+) -> str:
+    """Returns the path of the output file of a newspaper for a raw file.
+
+    The name is the same as the one of the files created from the `selected`
+    directory, so that the newspapers directories can be loaded as before.
+
+    Args:
+        newspaper (str): name of the newspaper.
+        filename (str): name of the raw Quotebank file.
+        output_dir (str, optional): directory containing one directory per
+        newspaper. Defaults to DATA_DIR.
+
+    Returns:
+        str: path of the output file.
+    """
+    return os.path.join(
+        output_dir, newspaper, f'{newspaper}-selected-{filename}'
+    )
+
+
+def route_quotes_file(
+    filename_in: str,
+    output_dir: str = DATA_DIR,
+    newspaper_domain: dict = NEWSPAPER_DOMAIN,
+) -> dict:
+    """Reads a raw Quotebank file once and writes each quote in the file of
+    every newspaper that published it.
+
+    The lines are written as they are read, without serializing them again.
+
+    Args:
+        filename_in (str): path to the raw bz2 file.
+        output_dir (str, optional): directory containing one directory per
+        newspaper. Defaults to DATA_DIR.
+        newspaper_domain (dict, optional): dictionary of newspapers and
+        domains. Defaults to NEWSPAPER_DOMAIN.
+
+    Returns:
+        dict: number of quotes written per newspaper.
+    """
+    filename = os.path.basename(filename_in)
+    counts = dict.fromkeys(newspaper_domain, 0)
+    files_out = dict()
+    try:
+        # Open one output stream per newspaper
+        for newspaper in newspaper_domain:
+            os.makedirs(os.path.join(output_dir, newspaper), exist_ok=True)
+            filename_out = get_newspaper_filename(
+                newspaper, filename, output_dir
+            )
+            files_out[newspaper] = bz2.open(filename_out, 'wb')
+
+        # Route each quote
+        with bz2.open(filename_in, 'rb') as file_in:
+            for line in file_in:
+                urls = json.loads(line)['urls']
+                for newspaper in get_newspapers_from_urls(
+                    urls, newspaper_domain
+                ):
+                    files_out[newspaper].write(line)
+                    counts[newspaper] += 1
+    finally:
+        for file_out in files_out.values():
+            file_out.close()
+
+    return counts
+
+
+def route_quotebank_files(
+    dirname: str = QUOTEBANK_DIR,
+    output_dir: str = DATA_DIR,
+    newspaper_domain: dict = NEWSPAPER_DOMAIN,
+    max_workers: int = None,
+) -> dict:
+    """Creates the newspapers files from all the raw Quotebank files of a
+    directory. The raw files are processed in parallel in a process pool.
+
+    Args:
+        dirname (str, optional): directory with the raw Quotebank files.
+        Defaults to QUOTEBANK_DIR.
+        output_dir (str, optional): directory containing one directory per
+        newspaper. Defaults to DATA_DIR.
+        newspaper_domain (dict, optional): dictionary of newspapers and
+        domains. Defaults to NEWSPAPER_DOMAIN.
+        max_workers (int, optional): number of processes. Defaults to None
+        (number of processors).
+
+    Returns:
+        dict: number of quotes written per raw file and per newspaper.
+    """
+    filenames = sorted(os.listdir(dirname))
+    results = dict()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(
+                route_quotes_file,
+                os.path.join(dirname, filename),
+                output_dir,
+                newspaper_domain,
+            ): filename
+            for filename in filenames
+        }
+        for future in tqdm(
+            as_completed(futures),
+            total=len(futures),
+            desc='Route Quotebank files',
+            unit='file',
+        ):
+            results[futures[future]] = future.result()
+
+    return results
+
+
+if __name__ == '__main__':
+    for filename, counts in route_quotebank_files().items():
+        print(filename, counts)
@@ -1,39 +1,107 @@
 """
 Sentiment analysis functions.
+
+To run the sentiment analysis benchmark on the test dataset:
+python3 -m src.sentiment_analysis
 """
-import nltk
+import hashlib
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import repeat
+from typing import TYPE_CHECKING
+
+import numpy as np
 import pandas as pd
-from nltk.sentiment import SentimentIntensityAnalyzer
-from scipy.stats import ttest_ind
-from sklearn.decomposition import PCA
-from sklearn.preprocessing import StandardScaler
 from tabulate import tabulate
 from tqdm import tqdm
 
-from .constants import COMPOUND_SCORE_COL, PARTY_NAME_COL, QUOTATION_COL
+from .constants import (COMPOUND_SCORE_COL, LABEL_COL, PARTY_NAME_COL,
+                        POLARITY_SCORE_COLS, QUOTATION_COL)
+from .text_cache import CACHE_CHUNKSIZE, compute_with_cache
+
+if TYPE_CHECKING:
+    from nltk.sentiment import SentimentIntensityAnalyzer
 
 pd.options.mode.chained_assignment = None
 
-# Init progress bar
-tqdm.pandas()
+# Lexicon of the sentiment analyzer
+VADER_LEXICON = 'vader_lexicon'
+
+# Polarity components of VADER
+POLARITY_COMPONENTS = list(POLARITY_SCORE_COLS)
+
+# Table of the polarity scores in the cache
+SENTIMENT_CACHE_TABLE = 'polarity_scores'
+
+# Number of resampled values drawn at once, and of resamples per task
+RESAMPLE_BATCH_SIZE = 10_000_000
+RESAMPLES_PER_TASK = 1000
+
+# Relative tolerance of the permuted differences equal to the observed one
+RESAMPLE_TOLERANCE = 1e-12
+
+# Scores of the two groups by topic in a process of the resampling tests
+_resample_scores = dict()
+
 
-# Download lexicon
-nltk.download('vader_lexicon')
+@lru_cache(maxsize=None)
+def get_sia() -> 'SentimentIntensityAnalyzer':
+    """Returns NLTK’s Pre-Trained Sentiment Analyzer, created on the first
+    call only. The lexicon is only downloaded if it is not installed.
+
+    Returns:
+        SentimentIntensityAnalyzer: sentiment analyzer.
+    """
+    import nltk
+    from nltk.sentiment import SentimentIntensityAnalyzer
+
+    try:
+        nltk.data.find(f'sentiment/{VADER_LEXICON}.zip')
+    except LookupError:
+        nltk.download(VADER_LEXICON)
+    return SentimentIntensityAnalyzer()
+
+
+@lru_cache(maxsize=None)
+def get_sia_version() -> str:
+    """Returns the version of the sentiment analyzer, used to invalidate the
+    cached scores of another NLTK version or VADER lexicon.
+
+    Returns:
+        str: version of the sentiment analyzer.
+    """
+    import nltk
 
-# NLTK’s Pre-Trained Sentiment Analyzer
-sia = SentimentIntensityAnalyzer()
+    digest = hashlib.blake2b(
+        get_sia().lexicon_file.encode('utf-8'), digest_size=8
+    ).hexdigest()
+    return f'nltk-{nltk.__version__}/vader-{digest}'
 
 
-def get_polarity_scores(text) -> dict:
+def get_polarity_scores(text, cache_filename: str = None) -> dict:
     """Returns the polarity scores for a quotation.
 
     Args:
         text (str): text or quotation.
+        cache_filename (str, optional): path to the sentiment cache, checked
+        first. Defaults to None (no cache).
 
     Returns:
         dict: polarity scores (compound, neg, neu, pos).
     """
-    return sia.polarity_scores(text)
+    if cache_filename is not None:
+        return compute_with_cache(
+            [text],
+            lambda texts: [get_sia().polarity_scores(text) for text in texts],
+            cache_filename,
+            SENTIMENT_CACHE_TABLE,
+            get_sia_version(),
+        )[0]
+
+    return get_sia().polarity_scores(text)
 
 
 def get_compound_score(text: str) -> float:
@@ -48,8 +116,147 @@ def get_compound_score(text: str) -> float:
     return get_polarity_scores(text)['compound']
 
 
-def add_col_compound_score(df: pd.DataFrame,
-                           text_col: str = QUOTATION_COL) -> None:
+def get_polarity_scores_batch(
+    texts: list,
+    components: list = ['compound'],
+) -> np.ndarray:
+    """Returns polarity scores of quotations.
+
+    Args:
+        texts (list): texts or quotations.
+        components (list, optional): polarity components among 'neg', 'neu',
+        'pos' and 'compound'. Defaults to ['compound'].
+
+    Returns:
+        np.ndarray: scores (texts x components).
+    """
+    sia = get_sia()
+    scores = np.empty((len(texts), len(components)))
+    for i, text in enumerate(texts):
+        polarity_scores = sia.polarity_scores(text)
+        scores[i] = [polarity_scores[component] for component in components]
+    return scores
+
+
+def compute_polarity_scores(
+    texts: list,
+    components: list = ['compound'],
+    max_workers: int = 1,
+    chunksize: int = 10_000,
+) -> np.ndarray:
+    """Returns polarity scores of quotations, computed by chunks in a process
+    pool. Each worker creates its sentiment analyzer once, and the scores of
+    the chunks are written in a preallocated array.
+
+    Args:
+        texts (list): texts or quotations.
+        components (list, optional): polarity components among 'neg', 'neu',
+        'pos' and 'compound'. Defaults to ['compound'].
+        max_workers (int, optional): number of processes. None for the number
+        of processors. Defaults to 1 (no process pool).
+        chunksize (int, optional): number of texts per chunk.
+        Defaults to 10000.
+
+    Returns:
+        np.ndarray: scores (texts x components).
+    """
+    unknown = set(components).difference(POLARITY_SCORE_COLS)
+    if unknown:
+        raise ValueError(f'Unknown polarity components: {sorted(unknown)}')
+
+    texts = list(texts)
+    starts = range(0, len(texts), chunksize)
+    scores = np.empty((len(texts), len(components)))
+    if max_workers == 1:
+        for start in tqdm(starts, desc='Polarity scores', unit='chunk'):
+            scores[start:start + chunksize] = get_polarity_scores_batch(
+                texts[start:start + chunksize], components
+            )
+        return scores
+
+    with ProcessPoolExecutor(
+        max_workers=max_workers, initializer=get_sia
+    ) as executor:
+        chunks = executor.map(
+            get_polarity_scores_batch,
+            (texts[start:start + chunksize] for start in starts),
+            repeat(components),
+        )
+        for start, chunk_scores in zip(
+            tqdm(starts, desc='Polarity scores', unit='chunk'), chunks
+        ):
+            scores[start:start + chunksize] = chunk_scores
+    return scores
+
+
+def add_cols_polarity_scores(
+    df: pd.DataFrame,
+    text_col: str = QUOTATION_COL,
+    components: list = ['compound'],
+    max_workers: int = 1,
+    chunksize: int = 10_000,
+    cache_filename: str = None,
+) -> None:
+    """Adds the columns of polarity scores for sentiment analysis to a
+    dataframe of quotes (`neg_score`, `neu_score`, `pos_score` and
+    `compound_score`).
+
+    Args:
+        df (pd.DataFrame): dataframe.
+        text_col (str, optional): name of the column containing quotations.
+        Defaults to 'quotation'.
+        components (list, optional): polarity components among 'neg', 'neu',
+        'pos' and 'compound'. Defaults to ['compound'].
+        max_workers (int, optional): number of processes. None for the number
+        of processors. Defaults to 1 (no process pool).
+        chunksize (int, optional): number of texts per chunk.
+        Defaults to 10000.
+        cache_filename (str, optional): path to the sentiment cache. Only the
+        quotes that are not in the cache are scored, the others are read in
+        a single lookup. Defaults to None (no cache).
+    """
+    if cache_filename is not None:
+        def compute(texts) -> list:
+            scores = compute_polarity_scores(
+                texts, POLARITY_COMPONENTS, max_workers, chunksize
+            )
+            return [
+                dict(zip(POLARITY_COMPONENTS, row)) for row in scores.tolist()
+            ]
+
+        # One chunk per worker between two commits in the cache
+        n_workers = max_workers or os.cpu_count() or 1
+        values = compute_with_cache(
+            df[text_col],
+            compute,
+            cache_filename,
+            SENTIMENT_CACHE_TABLE,
+            get_sia_version(),
+            chunksize=max(CACHE_CHUNKSIZE, chunksize * n_workers),
+        )
+        scores = np.array(
+            [
+                [value[component] for component in components]
+                for value in values
+            ],
+            dtype=np.float64,
+        ).reshape(len(values), len(components))
+    else:
+        scores = compute_polarity_scores(
+            df[text_col], components, max_workers, chunksize
+        )
+
+    for i, component in enumerate(components):
+        df[POLARITY_SCORE_COLS[component]] = scores[:, i]
+
+
+def add_col_compound_score(
+    df: pd.DataFrame,
+    text_col: str = QUOTATION_COL,
+    max_workers: int = 1,
+    chunksize: int = 10_000,
+    cache_filename: str = None,
+) -> None:
     """Adds the column of compound score for sentiment analysis to a dataframe
     of quotes.
 
@@ -57,40 +264,553 @@ def add_col_compound_score(df: pd.DataFrame,
         df (pd.DataFrame): dataframe.
         text_col (str, optional): name of the column containing quotations.
         Defaults to 'quotation'.
+        max_workers (int, optional): number of processes. None for the number
+        of processors. Defaults to 1 (no process pool).
+        chunksize (int, optional): number of texts per chunk.
+        Defaults to 10000.
+        cache_filename (str, optional): path to the sentiment cache. Only the
+        quotes that are not in the cache are scored. Defaults to None (no
+        cache).
     """
-    df[COMPOUND_SCORE_COL] = df[text_col].progress_apply(get_compound_score)
+    add_cols_polarity_scores(
+        df, text_col, ['compound'], max_workers, chunksize, cache_filename
+    )
+
+
+def benchmark_polarity_scores(
+    texts: list,
+    n: int = 100_000,
+    max_workers: int = None,
+) -> dict:
+    """Compares the scoring of quotations one by one with
+    `get_compound_score` and by chunks in a process pool.
+
+    Args:
+        texts (list): texts or quotations, repeated to get `n` texts.
+        n (int, optional): number of texts. Defaults to 100000.
+        max_workers (int, optional): number of processes. Defaults to None
+        (number of processors).
+
+    Returns:
+        dict: throughputs and equality of the compound scores.
+    """
+    texts = (texts * (n // len(texts) + 1))[:n]
+    n_cores = max_workers or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    scores = [get_compound_score(text) for text in texts]
+    time_single = time.perf_counter() - start
 
+    start = time.perf_counter()
+    scores_pool = compute_polarity_scores(texts, max_workers=max_workers)
+    time_pool = time.perf_counter() - start
 
-def run_ttest(df: pd.DataFrame, alpha: float = 0.05) -> str:
+    return {
+        'single (quotes/s)': n / time_single,
+        'pool (quotes/s)': n / time_pool,
+        'pool per core (quotes/s)': n / time_pool / n_cores,
+        'same scores': np.array_equal(scores, scores_pool[:, 0]),
+    }
+
+
+def get_grouped_statistics(
+    df: pd.DataFrame,
+    group_cols: list,
+    value_cols: list,
+) -> pd.DataFrame:
+    """Returns the sufficient statistics of the t-tests (count, sum and sum of
+    squares of the non missing values) of columns, per group. They are
+    computed for all the columns at once with a sparse product by the
+    indicator matrix of the groups.
+
+    Args:
+        df (pd.DataFrame): dataframe.
+        group_cols (list): columns of the groups.
+        value_cols (list): columns of the values.
+
+    Returns:
+        pd.DataFrame: statistics per group, with columns (statistic, column).
+    """
+    from scipy.sparse import csr_matrix
+
+    grouped = df.groupby(group_cols, observed=True)
+    codes = grouped.ngroup().to_numpy(dtype=float)
+    groups = grouped.size().index
+
+    # Rows with a missing group key (NaN code) are ignored
+    rows = np.flatnonzero(~np.isnan(codes))
+    indicator = csr_matrix(
+        (np.ones(len(rows)), (codes[rows].astype(np.int64), rows)),
+        shape=(len(groups), len(df)),
+    )
+
+    values = df[value_cols].to_numpy(dtype=np.float64)
+    is_value = ~np.isnan(values)
+    values = np.where(is_value, values, 0)
+    return pd.concat(
+        {
+            name: pd.DataFrame(
+                indicator @ matrix, index=groups, columns=value_cols
+            )
+            for name, matrix in [
+                ('count', is_value.astype(np.float64)),
+                ('sum', values),
+                ('sumsq', values ** 2),
+            ]
+        },
+        axis=1,
+    )
+
+
+def correct_pvalues(pvalues: np.ndarray, method: str) -> np.ndarray:
+    """Corrects p-values for multiple comparisons. The missing p-values are
+    ignored.
+
+    Args:
+        pvalues (np.ndarray): p-values.
+        method (str): 'bonferroni', 'holm' or 'fdr_bh' (Benjamini-Hochberg).
+
+    Raises:
+        ValueError: if the method is unknown.
+
+    Returns:
+        np.ndarray: corrected p-values.
+    """
+    pvalues = np.asarray(pvalues, dtype=np.float64)
+    corrected = np.full(pvalues.shape, np.nan)
+    tested = ~np.isnan(pvalues)
+    p = pvalues[tested]
+    m = len(p)
+    order = np.argsort(p)
+    ranks = np.arange(1, m + 1)
+
+    if method == 'bonferroni':
+        result = p * m
+    elif method == 'holm':
+        result = np.empty(m)
+        result[order] = np.maximum.accumulate(p[order] * (m - ranks + 1))
+    elif method == 'fdr_bh':
+        result = np.empty(m)
+        scaled = p[order] * m / ranks
+        result[order] = np.minimum.accumulate(scaled[::-1])[::-1]
+    else:
+        raise ValueError(f'Unknown correction method: {method}')
+
+    corrected[tested] = np.minimum(result, 1)
+    return corrected
+
+
+def compute_ttests(
+    df: pd.DataFrame,
+    party_pairs: list = [('democratic party', 'republican party')],
+    by: list = [],
+    value_cols: list = None,
+    equal_var: bool = True,
+    correction: str = None,
+    alpha: float = 0.05,
+) -> pd.DataFrame:
+    """Runs the t-tests of all the topics and pairs of parties at once, from
+    the grouped sufficient statistics. With `by` columns (e.g. newspaper and
+    year), the tests are run in each of their groups.
+
+    Args:
+        df (pd.DataFrame): dataframe of topics.
+        party_pairs (list, optional): pairs of parties to compare.
+        Defaults to [('democratic party', 'republican party')].
+        by (list, optional): other columns of the groups. Defaults to [].
+        value_cols (list, optional): columns of the scores. Defaults to None
+        (all the columns except the party, the label and the groups).
+        equal_var (bool, optional): True for Student's t-test, False for
+        Welch's t-test. Defaults to True.
+        correction (str, optional): correction of the p-values for multiple
+        comparisons over all the tests ('bonferroni', 'holm' or 'fdr_bh').
+        Defaults to None.
+        alpha (float, optional): significance level. Defaults to 0.05.
+
+    Returns:
+        pd.DataFrame: one row per group, pair of parties and topic, with the
+        counts, means, t-statistic, degrees of freedom and p-value.
+    """
+    from scipy.stats import t as t_dist
+
+    if value_cols is None:
+        value_cols = df.columns.drop(
+            [PARTY_NAME_COL, LABEL_COL, *by], errors='ignore'
+        ).tolist()
+
+    statistics = get_grouped_statistics(
+        df, [*by, PARTY_NAME_COL], value_cols
+    )
+    if by:
+        groups = statistics.index.droplevel(PARTY_NAME_COL).unique()
+        group_keys = [
+            key if isinstance(key, tuple) else (key,) for key in groups
+        ]
+    else:
+        group_keys = [()]
+
+    # Statistics of the parties of the pairs (pairs x groups x topics)
+    def get_party_statistics(parties: list, name: str) -> np.ndarray:
+        arrays = list()
+        for party in parties:
+            if by:
+                index = pd.MultiIndex.from_tuples(
+                    [(*key, party) for key in group_keys]
+                )
+            else:
+                index = pd.Index([party])
+            values = statistics[name].reindex(index=index, columns=value_cols)
+            arrays.append(values.to_numpy(dtype=np.float64))
+        return np.nan_to_num(np.stack(arrays))
+
+    parties_a = [party_a for party_a, _ in party_pairs]
+    parties_b = [party_b for _, party_b in party_pairs]
+    n_a = get_party_statistics(parties_a, 'count')
+    n_b = get_party_statistics(parties_b, 'count')
+    sum_a = get_party_statistics(parties_a, 'sum')
+    sum_b = get_party_statistics(parties_b, 'sum')
+    sumsq_a = get_party_statistics(parties_a, 'sumsq')
+    sumsq_b = get_party_statistics(parties_b, 'sumsq')
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_a = sum_a / n_a
+        mean_b = sum_b / n_b
+        var_a = np.maximum(sumsq_a - sum_a * mean_a, 0) / (n_a - 1)
+        var_b = np.maximum(sumsq_b - sum_b * mean_b, 0) / (n_b - 1)
+
+        if equal_var:
+            dof = n_a + n_b - 2
+            pooled_var = ((n_a - 1) * var_a + (n_b - 1) * var_b) / dof
+            std_error = np.sqrt(pooled_var * (1 / n_a + 1 / n_b))
+        else:
+            se2_a = var_a / n_a
+            se2_b = var_b / n_b
+            dof = (se2_a + se2_b) ** 2 / (
+                se2_a ** 2 / (n_a - 1) + se2_b ** 2 / (n_b - 1)
+            )
+            std_error = np.sqrt(se2_a + se2_b)
+
+        statistic = (mean_a - mean_b) / std_error
+        pvalue = 2 * t_dist.sf(np.abs(statistic), dof)
+
+    # One row per pair, group and topic
+    n_pairs, n_groups, n_topics = statistic.shape
+    df_ttests = pd.DataFrame({
+        col: np.tile(
+            np.repeat([key[i] for key in group_keys], n_topics), n_pairs
+        )
+        for i, col in enumerate(by)
+    })
+    df_ttests['party_a'] = np.repeat(parties_a, n_groups * n_topics)
+    df_ttests['party_b'] = np.repeat(parties_b, n_groups * n_topics)
+    df_ttests['topic'] = np.tile(value_cols, n_pairs * n_groups)
+    for name, values in [
+        ('count_a', n_a),
+        ('count_b', n_b),
+        ('mean_a', mean_a),
+        ('mean_b', mean_b),
+        ('statistic', statistic),
+        ('dof', dof),
+        ('pvalue', pvalue),
+    ]:
+        df_ttests[name] = values.ravel()
+
+    if correction is not None:
+        df_ttests['pvalue_corrected'] = correct_pvalues(
+            df_ttests['pvalue'], correction
+        )
+        df_ttests['significant'] = df_ttests['pvalue_corrected'] <= alpha
+    else:
+        df_ttests['significant'] = df_ttests['pvalue'] <= alpha
+
+    return df_ttests
+
+
+def make_html_table_ttests(df_ttests: pd.DataFrame, alpha: float = 0.05) \
+        -> str:
+    """Returns the table of the results of t-tests in html format. The
+    columns of the groups (`by` of `compute_ttests`) are shown first, then
+    the parties if several pairs were compared.
+
+    Args:
+        df_ttests (pd.DataFrame): results of `compute_ttests`.
+        alpha (float, optional): significance level. Defaults to 0.05.
+
+    Returns:
+        str: table of results in html format.
+    """
+    pvalue_col = (
+        'pvalue_corrected' if 'pvalue_corrected' in df_ttests.columns
+        else 'pvalue'
+    )
+
+    # Columns identifying the rows besides the topic
+    by = df_ttests.columns[:df_ttests.columns.get_loc('party_a')].tolist()
+    key_cols = by
+    key_headers = [str(col).capitalize() for col in by]
+    pairs = df_ttests[['party_a', 'party_b']].drop_duplicates()
+    if len(pairs) > 1:
+        key_cols = [*by, 'party_a', 'party_b']
+        key_headers = [*key_headers, 'Party A', 'Party B']
+
+    headers = [
+        *key_headers, 'Topic', 't-statistic', 'p-value', 'Same opinion?'
+    ]
+    results = [
+        [
+            *keys,
+            topic.replace(f'_{COMPOUND_SCORE_COL}', '').capitalize(),
+            statistic,
+            pvalue,
+            '✅' if pvalue > alpha else '❌',
+        ]
+        for keys, topic, statistic, pvalue in zip(
+            df_ttests[key_cols].itertuples(index=False, name=None),
+            df_ttests['topic'],
+            df_ttests['statistic'],
+            df_ttests[pvalue_col],
+        )
+    ]
+    return tabulate(results, headers=headers, tablefmt='html', floatfmt='.4f')
+
+
+def run_ttest(
+    df: pd.DataFrame,
+    alpha: float = 0.05,
+    equal_var: bool = True,
+    correction: str = None,
+) -> str:
     """Runs ttest on a dataframe of topics and returns a table with the results
     per topic between democratic and republican parties in html format.
 
     Args:
         df (pd.DataFrame): dataframe of topics.
         alpha (float, optional): significance level. Defaults to 0.05.
+        equal_var (bool, optional): True for Student's t-test, False for
+        Welch's t-test. Defaults to True.
+        correction (str, optional): correction of the p-values for multiple
+        comparisons ('bonferroni', 'holm' or 'fdr_bh'). Defaults to None.
 
     Returns:
         str: table of results in html format.
     """
-    # Create dataframe per party
-    df_democrats = df[df[PARTY_NAME_COL] == 'democratic party']
-    df_republicans = df[df[PARTY_NAME_COL] == 'republican party']
+    df_ttests = compute_ttests(
+        df, equal_var=equal_var, correction=correction, alpha=alpha
+    )
+    return make_html_table_ttests(df_ttests, alpha)
+
+
+def resample_mean_differences(
+    scores_a: np.ndarray,
+    scores_b: np.ndarray,
+    n_resamples: int,
+    seed: np.random.SeedSequence,
+    method: str = 'bootstrap',
+) -> np.ndarray:
+    """Returns the differences of means of resampled scores of two groups.
+    The resamples are drawn by batches of index arrays.
 
-    # Run ttest on each topic
-    headers = ['Topic', 't-statistic', 'p-value', 'Same opinion?']
-    results = list()
-    for topic in df.columns.drop([PARTY_NAME_COL, 'label']):
-        # Get scores
-        scores_democrats = df_democrats[topic].dropna()
-        scores_republicans = df_republicans[topic].dropna()
+    Args:
+        scores_a (np.ndarray): scores of the first group.
+        scores_b (np.ndarray): scores of the second group.
+        n_resamples (int): number of resamples.
+        seed (np.random.SeedSequence): seed of the random generator.
+        method (str, optional): 'bootstrap' to resample each group with
+        replacement, 'permutation' to permute the groups labels.
+        Defaults to 'bootstrap'.
 
-        # Run ttest
-        topic_name = topic.replace('_compound_score', '').capitalize()
-        statistic, pvalue = ttest_ind(scores_democrats, scores_republicans)
-        same_opinion = '✅' if pvalue > alpha else '❌'
-        results.append([topic_name, statistic, pvalue, same_opinion])
+    Raises:
+        ValueError: if the method is unknown.
+
+    Returns:
+        np.ndarray: differences of means (a - b).
+    """
+    if method not in ('bootstrap', 'permutation'):
+        raise ValueError(f'Unknown resampling method: {method}')
+
+    n_a = len(scores_a)
+    n_b = len(scores_b)
+    differences = np.full(n_resamples, np.nan)
+    if n_a == 0 or n_b == 0:
+        return differences
+
+    rng = np.random.default_rng(seed)
+    pooled = np.concatenate([scores_a, scores_b])
+    total = pooled.sum()
+    n_subset = min(n_a, n_b)
+    batch_size = max(1, RESAMPLE_BATCH_SIZE // (n_a + n_b))
+    for start in range(0, n_resamples, batch_size):
+        size = min(batch_size, n_resamples - start)
+        if method == 'bootstrap':
+            indices_a = rng.integers(n_a, size=(size, n_a), dtype=np.int32)
+            indices_b = rng.integers(n_b, size=(size, n_b), dtype=np.int32)
+            means_a = scores_a[indices_a].mean(axis=1)
+            means_b = scores_b[indices_b].mean(axis=1)
+        else:
+            # Random subsets of the size of the smallest group, from the
+            # smallest random keys of each resample (float64 keys, so that
+            # ties broken by position are negligible)
+            keys = rng.random((size, n_a + n_b))
+            subsets = np.argpartition(keys, n_subset - 1, axis=1)
+            sums = pooled[subsets[:, :n_subset]].sum(axis=1)
+            sums_a = sums if n_a <= n_b else total - sums
+            means_a = sums_a / n_a
+            means_b = (total - sums_a) / n_b
+        differences[start:start + size] = means_a - means_b
+
+    return differences
+
+
+def set_resample_scores(scores: dict) -> None:
+    """Sets the scores used by the resampling tasks of the current process.
+    It is the initializer of the process pool, so that the scores are sent
+    once to each process instead of with each task.
+
+    Args:
+        scores (dict): scores of the two groups (arrays) by topic.
+    """
+    _resample_scores.clear()
+    _resample_scores.update(scores)
 
-    return tabulate(results, headers=headers, tablefmt='html', floatfmt='.4f')
+
+def resample_topic_mean_differences(
+    topic: str,
+    method: str,
+    n_resamples: int,
+    seed: np.random.SeedSequence,
+) -> np.ndarray:
+    """Returns the differences of means of resampled scores of a topic set
+    by `set_resample_scores`.
+
+    Args:
+        topic (str): topic.
+        method (str): 'bootstrap' or 'permutation'.
+        n_resamples (int): number of resamples.
+        seed (np.random.SeedSequence): seed of the random generator.
+
+    Returns:
+        np.ndarray: differences of means (a - b).
+    """
+    scores_a, scores_b = _resample_scores[topic]
+    return resample_mean_differences(
+        scores_a, scores_b, n_resamples, seed, method
+    )
+
+
+def compute_resampling_tests(
+    df: pd.DataFrame,
+    party_a: str = 'democratic party',
+    party_b: str = 'republican party',
+    value_cols: list = None,
+    n_resamples: int = 10_000,
+    confidence: float = 0.95,
+    seed: int = 0,
+    max_workers: int = 1,
+) -> pd.DataFrame:
+    """Computes the bootstrap confidence intervals and the permutation
+    p-values of the differences of mean scores between two parties, for each
+    topic. The resamples are split into tasks of RESAMPLES_PER_TASK
+    resamples run in a process pool, each with its own seed: the results
+    only depend on `seed`, not on the number of processes. The scores are
+    sent once to each process, and the tasks only contain the topic, the
+    method, the number of resamples and the seed.
+
+    Args:
+        df (pd.DataFrame): dataframe of topics.
+        party_a (str, optional): first party.
+        Defaults to 'democratic party'.
+        party_b (str, optional): second party.
+        Defaults to 'republican party'.
+        value_cols (list, optional): columns of the scores. Defaults to None
+        (all the columns except the party and the label).
+        n_resamples (int, optional): number of resamples of each test.
+        Defaults to 10000.
+        confidence (float, optional): confidence level of the intervals.
+        Defaults to 0.95.
+        seed (int, optional): random seed. Defaults to 0.
+        max_workers (int, optional): number of processes. None for the number
+        of processors. Defaults to 1 (no process pool).
+
+    Returns:
+        pd.DataFrame: one row per topic, with the counts, means, difference
+        of means, bootstrap confidence interval and permutation p-value.
+    """
+    if value_cols is None:
+        value_cols = df.columns.drop(
+            [PARTY_NAME_COL, LABEL_COL], errors='ignore'
+        ).tolist()
+
+    is_a = (df[PARTY_NAME_COL] == party_a).to_numpy()
+    is_b = (df[PARTY_NAME_COL] == party_b).to_numpy()
+    scores = {
+        topic: (
+            df.loc[is_a, topic].dropna().to_numpy(dtype=np.float64),
+            df.loc[is_b, topic].dropna().to_numpy(dtype=np.float64),
+        )
+        for topic in value_cols
+    }
+
+    # Tasks (topic, method, number of resamples) with independent seeds
+    tasks = [
+        (topic, method, min(RESAMPLES_PER_TASK, n_resamples - start))
+        for topic in value_cols
+        for method in ('bootstrap', 'permutation')
+        for start in range(0, n_resamples, RESAMPLES_PER_TASK)
+    ]
+    seeds = np.random.SeedSequence(seed).spawn(len(tasks))
+    if max_workers == 1:
+        differences = [
+            resample_mean_differences(*scores[topic], size, task_seed, method)
+            for (topic, method, size), task_seed in zip(tasks, seeds)
+        ]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=set_resample_scores,
+            initargs=(scores,),
+        ) as executor:
+            differences = list(executor.map(
+                resample_topic_mean_differences,
+                [topic for topic, _, _ in tasks],
+                [method for _, method, _ in tasks],
+                [size for _, _, size in tasks],
+                seeds,
+            ))
+
+    resamples = defaultdict(list)
+    for (topic, method, _), values in zip(tasks, differences):
+        resamples[topic, method].append(values)
+
+    results = list()
+    quantiles = [(1 - confidence) / 2, (1 + confidence) / 2]
+    for topic in value_cols:
+        scores_a, scores_b = scores[topic]
+        mean_a = scores_a.mean() if len(scores_a) else np.nan
+        mean_b = scores_b.mean() if len(scores_b) else np.nan
+        difference = mean_a - mean_b
+        bootstrap = np.concatenate(resamples[topic, 'bootstrap'])
+        permutation = np.concatenate(resamples[topic, 'permutation'])
+        ci_low, ci_high = np.quantile(bootstrap, quantiles)
+
+        # The permuted means are computed from the sums of the groups, with
+        # other rounding errors than the observed means
+        scale = np.abs(np.concatenate([scores_a, scores_b])).max(initial=0)
+        threshold = np.abs(difference) - RESAMPLE_TOLERANCE * scale
+        n_extreme = np.sum(np.abs(permutation) >= threshold)
+        results.append({
+            'topic': topic,
+            'count_a': len(scores_a),
+            'count_b': len(scores_b),
+            'mean_a': mean_a,
+            'mean_b': mean_b,
+            'difference': difference,
+            'ci_low': ci_low,
+            'ci_high': ci_high,
+            'pvalue': (n_extreme + 1) / (n_resamples + 1)
+            if not np.isnan(difference) else np.nan,
+        })
+
+    return pd.DataFrame(results)
 
 
 def create_df_avg_compound_score(df_topics: pd.DataFrame) -> pd.DataFrame:
@@ -110,7 +830,9 @@ def create_df_avg_compound_score(df_topics: pd.DataFrame) -> pd.DataFrame:
     ]
 
     # Average compound scores
-    df_avg = df_demo_repu.groupby(['label', 'party_name']).mean()
+    df_avg = df_demo_repu.groupby(
+        ['label', 'party_name'], observed=True
+    ).mean()
 
     # Drop rows with all NaN and fill NaN by 0
     df_avg = df_avg.dropna(how='all')
@@ -138,6 +860,9 @@ def pca_analysis(
     # Replace missing entries with 0
     df_clean = df.fillna(0)
 
+    from sklearn.decomposition import PCA
+    from sklearn.preprocessing import StandardScaler
+
     # Perform PCA
     pca = PCA(n_components)
     if stardardize:
@@ -152,3 +877,11 @@ def pca_analysis(
     df_pca.columns = [f'PC{i + 1}' for i in range(n_components)]
 
     return pca, df_pca
+
+
+if __name__ == '__main__':
+    from .df_factory import create_df_test
+
+    quotes = create_df_test()[QUOTATION_COL].head(20_000).tolist()
+    for key, value in benchmark_polarity_scores(quotes).items():
+        print(f'{key}: {value}')
@@ -0,0 +1,196 @@
+"""
+Persistent cache of values computed from texts.
+
+The values (tokens, scores...) only depend on the text of a quotation, which
+often appears in several newspapers and is processed again at each run. They
+are stored in a SQLite table keyed by the hash of the normalized text and by
+the version of the computation (model, library...). The values of another
+version are ignored, so a cache is invalidated by changing the version.
+"""
+import hashlib
+import json
+import sqlite3
+from contextlib import closing
+
+from tqdm import tqdm
+
+# Number of texts computed between two commits in the cache
+CACHE_CHUNKSIZE = 10_000
+
+
+def normalize_text(text: str) -> str:
+    """Normalizes a text before hashing: leading, trailing and repeated
+    whitespaces are removed.
+
+    Args:
+        text (str): text or quotation.
+
+    Returns:
+        str: normalized text.
+    """
+    return ' '.join(text.split())
+
+
+def get_text_hash(text: str) -> bytes:
+    """Returns the hash of a normalized text.
+
+    Args:
+        text (str): text or quotation.
+
+    Returns:
+        bytes: 16 bytes hash.
+    """
+    return hashlib.blake2b(
+        normalize_text(text).encode('utf-8'), digest_size=16
+    ).digest()
+
+
+def open_text_cache(filename: str, table: str) -> sqlite3.Connection:
+    """Opens a cache and creates its table if needed.
+
+    Args:
+        filename (str): path to the SQLite file.
+        table (str): name of the table of the cache.
+
+    Returns:
+        sqlite3.Connection: connection to the cache.
+    """
+    conn = sqlite3.connect(filename)
+    conn.execute(
+        f'CREATE TABLE IF NOT EXISTS {table} ('
+        'hash BLOB NOT NULL, version TEXT NOT NULL, value TEXT NOT NULL, '
+        'PRIMARY KEY (hash, version)) WITHOUT ROWID'
+    )
+    conn.commit()
+    return conn
+
+
+def get_cached_values(
+    conn: sqlite3.Connection,
+    table: str,
+    hashes,
+    version: str,
+) -> dict:
+    """Returns the cached values of texts in a single lookup.
+
+    Args:
+        conn (sqlite3.Connection): connection to the cache.
+        table (str): name of the table of the cache.
+        hashes: hashes of the texts.
+        version (str): version of the values.
+
+    Returns:
+        dict: json encoded values by hash, for the cached texts only.
+    """
+    conn.execute(
+        'CREATE TEMP TABLE IF NOT EXISTS lookup (hash BLOB PRIMARY KEY)'
+    )
+    conn.execute('DELETE FROM lookup')
+    conn.executemany(
+        'INSERT OR IGNORE INTO lookup VALUES (?)', ((h,) for h in hashes)
+    )
+    rows = conn.execute(
+        f'SELECT c.hash, c.value FROM {table} c '
+        'JOIN lookup l ON c.hash = l.hash WHERE c.version = ?',
+        (version,),
+    )
+    return dict(rows)
+
+
+def add_values_to_cache(
+    conn: sqlite3.Connection,
+    table: str,
+    hashes: list,
+    values: list,
+    version: str,
+) -> None:
+    """Adds values to the cache.
+
+    Args:
+        conn (sqlite3.Connection): connection to the cache.
+        table (str): name of the table of the cache.
+        hashes (list): hashes of the texts.
+        values (list): values (json serializable).
+        version (str): version of the values.
+    """
+    conn.executemany(
+        f'INSERT OR REPLACE INTO {table} VALUES (?, ?, ?)',
+        (
+            (h, version, json.dumps(value))
+            for h, value in zip(hashes, values)
+        ),
+    )
+    conn.commit()
+
+
+def purge_text_cache(filename: str, table: str, version: str) -> int:
+    """Removes the values of the other versions from a cache.
+
+    Args:
+        filename (str): path to the SQLite file.
+        table (str): name of the table of the cache.
+        version (str): version to keep.
+
+    Returns:
+        int: number of removed values.
+    """
+    with closing(open_text_cache(filename, table)) as conn:
+        cursor = conn.execute(
+            f'DELETE FROM {table} WHERE version != ?', (version,)
+        )
+        conn.commit()
+        return cursor.rowcount
+
+
+def compute_with_cache(
+    texts,
+    compute,
+    filename: str,
+    table: str,
+    version: str,
+    chunksize: int = CACHE_CHUNKSIZE,
+) -> list:
+    """Returns the values of texts, computing only the texts that are not
+    already in the cache. Each distinct text is computed once, and the new
+    values are saved by chunks so that an interrupted run can be resumed.
+
+    Args:
+        texts: texts or quotations.
+        compute (callable): function returning the values of a list of
+        texts.
+        filename (str): path to the SQLite file.
+        table (str): name of the table of the cache.
+        version (str): version of the values.
+        chunksize (int, optional): number of texts computed between two
+        commits. Defaults to CACHE_CHUNKSIZE.
+
+    Returns:
+        list: values, in the same order as the texts.
+    """
+    texts = list(texts)
+    hashes = [get_text_hash(text) for text in texts]
+
+    with closing(open_text_cache(filename, table)) as conn:
+        cached = get_cached_values(conn, table, hashes, version)
+
+        # Distinct texts not in the cache
+        missing = dict()
+        for h, text in zip(hashes, texts):
+            if h not in cached and h not in missing:
+                missing[h] = text
+        missing = list(missing.items())
+
+        for i in tqdm(
+            range(0, len(missing), chunksize),
+            desc=f'Compute {table}',
+            unit='chunk',
+            disable=not missing,
+        ):
+            chunk = missing[i:i + chunksize]
+            chunk_hashes = [h for h, _ in chunk]
+            values = compute([text for _, text in chunk])
+            add_values_to_cache(conn, table, chunk_hashes, values, version)
+            cached.update(zip(chunk_hashes, map(json.dumps, values)))
+
+    # Decode each value to not share objects between rows
+    return [json.loads(cached[h]) for h in hashes]
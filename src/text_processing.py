@@ -1,40 +1,196 @@
 """
 Text processing functions.
+
+To run the tokenization benchmarks on the test dataset:
+python3 -m src.text_processing
 """
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from itertools import chain, islice, product
+from typing import TYPE_CHECKING
+
 import numpy as np
 import pandas as pd
-import spacy
-from empath import Empath
-from gensim.corpora import Dictionary
-from gensim.models import LdaMulticore
-from gensim.models.phrases import Phrases
 from scipy.sparse import csr_matrix
-from sklearn.decomposition import TruncatedSVD
-from sklearn.feature_extraction.text import TfidfVectorizer
 from tqdm import tqdm
 
 from .constants import (BOW_COL, COMPOUND_SCORE_COL, QUOTATION_COL, TOKENS_COL,
                         TOPICS_COL, TOPICS_DICT)
+from .paths import LDA_DIR, LEMMA_LOOKUP_PATH, LEXICON_PATH, PHRASES_PATH
+from .text_cache import CACHE_CHUNKSIZE, compute_with_cache
+from .token_store import (TokenStore, add_phrases, create_token_store,
+                          count_documents, count_tokens, get_bow_series,
+                          get_csr_matrix, get_doc_ids, get_tokens_series)
+
+if TYPE_CHECKING:
+    from empath import Empath
+    from gensim.corpora import Dictionary
+    from gensim.models import LdaMulticore
+    from gensim.models.phrases import FrozenPhrases, Phrases
+    from spacy.language import Language
 
 pd.options.mode.chained_assignment = None
 
-# Init progress bar
-tqdm.pandas()
+# spaCy pipeline of the tokenizer and lemmatizer, loaded on first use
+SPACY_MODEL = 'en_core_web_sm'
+
+# Pipeline components not needed by the tokenization (lemmas, alpha, stop)
+DISABLED_PIPES = ['parser', 'ner']
+
+# Table of the tokens in the cache
+TOKENS_CACHE_TABLE = 'tokens'
+
+# Batches tokenized by each spaCy process between two commits in the cache,
+# so that the processes are not started again for every few batches
+CACHE_BATCHES_PER_PROCESS = 10
+
+# Files of a serialized corpus in the LDA cache
+CORPUS_FILENAME = 'corpus.mm'
+DICTIONARY_FILENAME = 'dictionary.dict'
+SWEEP_RESULTS_FILENAME = 'lda-sweep.csv'
+BEST_MODEL_FILENAME = 'lda-best.model'
+
+# Number of Bag-of-words hashed at a time in the fingerprint of a corpus
+FINGERPRINT_CHUNKSIZE = 10000
+
+# Empath model generating the vocabularies of the topics, and version of the
+# lexicon file
+LEXICON_MODEL = 'nytimes'
+LEXICON_VERSION = 1
+
+# Numbers (words containing a digit) and punctuation removed from texts. The
+# word boundary avoids trying every position of the words without digit.
+DIGIT_PATTERN = re.compile(r'\d')
+NUMBER_PATTERN = re.compile(r'\b[^\W\d]*\d\w*')
+PUNCTUATION_PATTERN = re.compile(r'[^\w\s]+')
+ASCII_PUNCTUATION = bytes(
+    c for c in range(128) if not re.match(r'[\w\s]', chr(c))
+)
+
+# Words of the fast tokenizer (sequences of letters, like `is_alpha`) and
+# contractions split by spaCy (don't -> do n't, Trump's -> Trump 's)
+WORD_PATTERN = re.compile(r'[^\W\d_]+')
+CONTRACTION_PATTERN = re.compile(
+    r"n['’]t\b|['’](?:s|re|ve|ll|d|m)\b", re.IGNORECASE
+)
+
+
+@lru_cache(maxsize=None)
+def get_nlp() -> 'Language':
+    """Returns the spaCy pipeline, loaded on the first call only.
+
+    Returns:
+        Language: spaCy pipeline.
+    """
+    import spacy
+
+    return spacy.load(SPACY_MODEL)
+
+
+@lru_cache(maxsize=None)
+def get_stopwords() -> frozenset:
+    """Returns the spaCy list of stopwords, loaded on the first call only.
+
+    Returns:
+        frozenset: stopwords.
+    """
+    from spacy.lang.en.stop_words import STOP_WORDS
+
+    return frozenset(STOP_WORDS)
+
+
+def normalize_text(text: str) -> str:
+    """Preprocesses a text in a single pass:
+
+    - Remove the line breaks
+    - Remove the numbers
+    - Remove the punctuation
+    - Remove the capital letters
+
+    Args:
+        text (str): text or quotation.
+
+    Returns:
+        str: normalized text (unchanged if it is not a string).
+    """
+    if not isinstance(text, str):
+        return text
+    text = text.replace('\n', ' ')
+    if DIGIT_PATTERN.search(text):
+        text = NUMBER_PATTERN.sub('', text)
+
+    # Fast path for ascii texts
+    if text.isascii():
+        text = text.encode('ascii').translate(None, ASCII_PUNCTUATION)
+        return text.lower().decode('ascii')
 
-# Tokenizer and lemmatizer function
-nlp = spacy.load('en_core_web_sm')
+    return PUNCTUATION_PATTERN.sub('', text).lower()
 
-# Stopwords list
-STOPWORDS = spacy.lang.en.stop_words.STOP_WORDS
 
+def normalize_texts(texts: list) -> list:
+    """Preprocesses a list of texts with `normalize_text`.
+
+    Args:
+        texts (list): texts or quotations.
 
-def clean_col_text(df: pd.DataFrame, text_col: str = QUOTATION_COL) -> None:
+    Returns:
+        list: normalized texts.
+    """
+    return [normalize_text(text) for text in texts]
+
+
+def clean_col_text(
+    df: pd.DataFrame,
+    text_col: str = QUOTATION_COL,
+    max_workers: int = 1,
+    chunksize: int = 100_000,
+) -> None:
     """Preprocesses a text column in a dataframe:
 
     - Remove the line breaks
+    - Remove the numbers
     - Remove the punctuation
     - Remove the capital letters
 
+    Args:
+        df (pd.DataFrame): dataframe.
+        text_col (str, optional): name of the column. Defaults to 'quotation'.
+        max_workers (int, optional): number of processes normalizing chunks
+        of texts. None for the number of processors. Defaults to 1.
+        chunksize (int, optional): number of texts per chunk with several
+        processes. Defaults to 100000.
+    """
+    texts = df[text_col].tolist()
+    if max_workers == 1:
+        df[text_col] = normalize_texts(texts)
+        return
+
+    chunks = [
+        texts[i:i + chunksize] for i in range(0, len(texts), chunksize)
+    ]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        df[text_col] = [
+            text
+            for chunk in executor.map(normalize_texts, chunks)
+            for text in chunk
+        ]
+
+
+def clean_col_text_multipass(
+    df: pd.DataFrame,
+    text_col: str = QUOTATION_COL,
+) -> None:
+    """Previous version of `clean_col_text`, with one pass over the column
+    per step. Kept as reference for the benchmark.
+
     Args:
         df (pd.DataFrame): dataframe.
         text_col (str, optional): name of the column. Defaults to 'quotation'.
@@ -52,18 +208,56 @@ def clean_col_text(df: pd.DataFrame, text_col: str = QUOTATION_COL) -> None:
     df[text_col] = df[text_col].str.lower()
 
 
-def get_tokens(text: str) -> list:
-    """Preprocessing of a quote for LDA. It returns the list of tokens for the
-    text after filtering.
+def benchmark_clean_col_text(
+    texts: list,
+    n: int = 1_000_000,
+    max_workers: int = None,
+) -> dict:
+    """Compares the four passes and the single pass text preprocessing.
 
     Args:
-        text (str): text or quotation.
+        texts (list): texts or quotations, repeated to get `n` texts.
+        n (int, optional): number of texts. Defaults to 1000000.
+        max_workers (int, optional): number of processes for the parallel
+        single pass. Defaults to None (number of processors).
 
     Returns:
-        list: tokens.
+        dict: durations in seconds and equality of the results (apart from
+        the line breaks, which were not removed by the four passes).
     """
-    doc = nlp(text)
+    texts = (texts * (n // len(texts) + 1))[:n]
+    results = dict()
+    for name, clean in [
+        ('four passes', clean_col_text_multipass),
+        ('single pass', clean_col_text),
+        ('single pass parallel', lambda df: clean_col_text(
+            df, max_workers=max_workers
+        )),
+    ]:
+        df = pd.DataFrame({QUOTATION_COL: pd.Series(texts, dtype=object)})
+        start = time.perf_counter()
+        clean(df)
+        results[f'{name} (s)'] = time.perf_counter() - start
+        results[name] = df[QUOTATION_COL].str.replace('\n', ' ')
+
+    results['same texts'] = all(
+        results['four passes'].tolist() == results[name].tolist()
+        for name in ('single pass', 'single pass parallel')
+    )
+    for name in ('four passes', 'single pass', 'single pass parallel'):
+        del results[name]
+    return results
+
+
+def get_tokens_from_doc(doc) -> list:
+    """Returns the list of tokens of a spaCy document after filtering.
+
+    Args:
+        doc (Doc): spaCy document.
 
+    Returns:
+        list: tokens.
+    """
     # Keep only words (no numbers, no punctuation).
     # Lemmatize tokens, remove punctuation and remove stopwords.
     doc = [
@@ -72,23 +266,251 @@ def get_tokens(text: str) -> list:
 
     # Remove common words from the stopword list and keep only words of length
     # 3 or more.
-    doc = [token for token in doc if token not in STOPWORDS and len(token) > 2]
+    stopwords = get_stopwords()
+    doc = [token for token in doc if token not in stopwords and len(token) > 2]
 
     return doc
 
 
-def add_col_tokens(df: pd.DataFrame, text_col: str = QUOTATION_COL) -> None:
+def get_tokens(text: str) -> list:
+    """Preprocessing of a quote for LDA. It returns the list of tokens for the
+    text after filtering.
+
+    Args:
+        text (str): text or quotation.
+
+    Returns:
+        list: tokens.
+    """
+    return get_tokens_from_doc(get_nlp()(text))
+
+
+def get_tokens_batch(
+    texts,
+    batch_size: int = 1000,
+    n_process: int = 1,
+) -> list:
+    """Returns the lists of tokens of texts, processed by batches with
+    `nlp.pipe`. The components not needed by the tokenization are disabled.
+
+    Args:
+        texts: texts or quotations.
+        batch_size (int, optional): number of texts per batch.
+        Defaults to 1000.
+        n_process (int, optional): number of processes. Defaults to 1.
+
+    Returns:
+        list: lists of tokens, in the same order as the texts.
+    """
+    docs = get_nlp().pipe(
+        texts,
+        batch_size=batch_size,
+        n_process=n_process,
+        disable=DISABLED_PIPES,
+    )
+    return [get_tokens_from_doc(doc) for doc in docs]
+
+
+def create_lemma_lookup(texts, batch_size: int = 1000) -> dict:
+    """Creates the lemma lookup table of the fast tokenizer from the lemmas
+    found by spaCy on a sample of texts. Each word is mapped to its most
+    frequent lemma.
+
+    Args:
+        texts: sample of texts or quotations.
+        batch_size (int, optional): number of texts per batch.
+        Defaults to 1000.
+
+    Returns:
+        dict: lemma by word.
+    """
+    lemmas = defaultdict(Counter)
+    docs = get_nlp().pipe(texts, batch_size=batch_size, disable=DISABLED_PIPES)
+    for doc in docs:
+        for token in doc:
+            if token.is_alpha:
+                lemmas[token.text][token.lemma_] += 1
+
+    return {
+        word: counter.most_common(1)[0][0] for word, counter in lemmas.items()
+    }
+
+
+def save_lemma_lookup(
+    lemma_lookup: dict,
+    filename: str = LEMMA_LOOKUP_PATH,
+) -> None:
+    """Saves a lemma lookup table in a json file.
+
+    Args:
+        lemma_lookup (dict): lemma by word.
+        filename (str, optional): path to the json file.
+        Defaults to LEMMA_LOOKUP_PATH.
+    """
+    with open(filename, 'w') as f:
+        json.dump(lemma_lookup, f)
+
+
+def load_lemma_lookup(filename: str = LEMMA_LOOKUP_PATH) -> dict:
+    """Loads a lemma lookup table from a json file.
+
+    Args:
+        filename (str, optional): path to the json file.
+        Defaults to LEMMA_LOOKUP_PATH.
+
+    Returns:
+        dict: lemma by word.
+    """
+    with open(filename) as f:
+        return json.load(f)
+
+
+def get_tokens_fast(text: str, lemma_lookup: dict) -> list:
+    """Fast version of `get_tokens`, using a regex tokenizer and a lemma
+    lookup table instead of the spaCy pipeline. The unknown words are
+    lowercased.
+
+    Args:
+        text (str): text or quotation.
+        lemma_lookup (dict): lemma by word.
+
+    Returns:
+        list: tokens.
+    """
+    stopwords = get_stopwords()
+    doc = [
+        lemma_lookup.get(word, word.lower())
+        for word in WORD_PATTERN.findall(CONTRACTION_PATTERN.sub(' ', text))
+        if word.lower() not in stopwords
+    ]
+    doc = [token for token in doc if token not in stopwords and len(token) > 2]
+    return doc
+
+
+def get_fast_tokenizer_version(lemma_lookup: dict) -> str:
+    """Returns the version of the fast tokenizer, which depends on its lemma
+    lookup table.
+
+    Args:
+        lemma_lookup (dict): lemma by word.
+
+    Returns:
+        str: version of the fast tokenizer.
+    """
+    digest = hashlib.blake2b(
+        json.dumps(lemma_lookup, sort_keys=True).encode('utf-8'),
+        digest_size=8,
+    ).hexdigest()
+    return f'fast/{digest}'
+
+
+def get_tokenizer_version() -> str:
+    """Returns the version of the tokenizer, used to invalidate the cached
+    tokens of another spaCy model or version.
+
+    Returns:
+        str: version of the tokenizer.
+    """
+    import spacy
+
+    meta = get_nlp().meta
+    return (
+        f"spacy-{spacy.__version__}/"
+        f"{meta['lang']}_{meta['name']}-{meta['version']}"
+    )
+
+
+def add_col_tokens(
+    df: pd.DataFrame,
+    text_col: str = QUOTATION_COL,
+    batch_size: int = None,
+    n_process: int = 1,
+    cache_filename: str = None,
+    lemma_lookup: dict = None,
+) -> None:
     """Adds the column of tokens to a dataframe of quotes.
 
     Args:
         df (pd.DataFrame): dataframe.
         text_col (str, optional): name of the column containing quotations.
         Defaults to 'quotation'.
+        batch_size (int, optional): number of quotes per batch to tokenize by
+        batches. Defaults to None (one quote at a time).
+        n_process (int, optional): number of processes when tokenizing by
+        batches. Defaults to 1.
+        cache_filename (str, optional): path to the tokens cache. Only the
+        quotes that are not in the cache are tokenized. Defaults to None
+        (no cache).
+        lemma_lookup (dict, optional): lemma lookup table to use the fast
+        tokenizer instead of spaCy. Defaults to None.
+    """
+    chunksize = CACHE_CHUNKSIZE
+    if lemma_lookup is not None:
+        def tokenize(texts) -> list:
+            return [get_tokens_fast(text, lemma_lookup) for text in texts]
+        version = get_fast_tokenizer_version(lemma_lookup)
+    elif batch_size is not None:
+        def tokenize(texts) -> list:
+            return get_tokens_batch(texts, batch_size, n_process)
+        version = get_tokenizer_version()
+
+        # One `nlp.pipe` (and pool of processes) per chunk of the cache
+        chunksize = max(
+            chunksize, batch_size * n_process * CACHE_BATCHES_PER_PROCESS
+        )
+    else:
+        def tokenize(texts) -> list:
+            return [get_tokens(text) for text in texts]
+        version = get_tokenizer_version()
+
+    if cache_filename is not None:
+        df[TOKENS_COL] = compute_with_cache(
+            df[text_col],
+            tokenize,
+            cache_filename,
+            TOKENS_CACHE_TABLE,
+            version,
+            chunksize=chunksize,
+        )
+    else:
+        df[TOKENS_COL] = tokenize(
+            tqdm(df[text_col], desc='Tokenize', unit='quote')
+        )
+
+
+def benchmark_tokenization(
+    texts: list,
+    batch_size: int = 1000,
+    n_process: int = 1,
+) -> dict:
+    """Compares the tokenization quote by quote and by batches.
+
+    Args:
+        texts (list): texts or quotations.
+        batch_size (int, optional): number of texts per batch.
+        Defaults to 1000.
+        n_process (int, optional): number of processes. Defaults to 1.
+
+    Returns:
+        dict: throughputs in quotes per second and equality of the tokens.
     """
-    df[TOKENS_COL] = df[text_col].progress_apply(get_tokens)
+    start = time.perf_counter()
+    tokens = [get_tokens(text) for text in texts]
+    time_single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tokens_batch = get_tokens_batch(texts, batch_size, n_process)
+    time_batch = time.perf_counter() - start
 
+    return {
+        'single (quotes/s)': len(texts) / time_single,
+        'batch (quotes/s)': len(texts) / time_batch,
+        'speedup': time_single / time_batch,
+        'same tokens': tokens == tokens_batch,
+    }
 
-def add_bigrams_to_list(tokens: list, bigrams: Phrases) -> list:
+
+def add_bigrams_to_list(tokens: list, bigrams: 'Phrases') -> list:
     """Returns the list of tokens extended with bigrams.
 
     Args:
@@ -105,25 +527,124 @@ def add_bigrams_to_list(tokens: list, bigrams: Phrases) -> list:
     return tokens
 
 
-def add_bigrams(df: pd.DataFrame) -> None:
+def train_phrases(
+    token_chunks,
+    min_count: int = 15,
+    threshold: float = 10.0,
+) -> 'FrozenPhrases':
+    """Trains a bigrams model in a single streaming pass over chunks of
+    tokens, and freezes it. Only the counts of the words and pairs of words
+    are kept in memory, not the tokens.
+
+    Args:
+        token_chunks: iterable of chunks of lists of tokens (lists, series,
+        token stores...), e.g. `iter_tokens_from_parquet()` for all the
+        newspapers.
+        min_count (int, optional): minimum count of a bigram. Defaults to 15.
+        threshold (float, optional): minimum score of a bigram.
+        Defaults to 10.0.
+
+    Returns:
+        FrozenPhrases: frozen bigrams model.
+    """
+    from gensim.models.phrases import Phrases
+
+    phrases = Phrases(min_count=min_count, threshold=threshold)
+    for chunk in tqdm(token_chunks, desc='Train bigrams', unit='chunk'):
+        if isinstance(chunk, TokenStore):
+            chunk = get_tokens_series(chunk)
+        phrases.add_vocab(chunk)
+    return phrases.freeze()
+
+
+def save_phrases(
+    phrases: 'FrozenPhrases',
+    filename: str = PHRASES_PATH,
+) -> None:
+    """Saves a frozen bigrams model.
+
+    Args:
+        phrases (FrozenPhrases): frozen bigrams model.
+        filename (str, optional): path to the file.
+        Defaults to PHRASES_PATH.
+    """
+    phrases.save(filename)
+
+
+def load_phrases(filename: str = PHRASES_PATH) -> 'FrozenPhrases':
+    """Loads a frozen bigrams model.
+
+    Args:
+        filename (str, optional): path to the file.
+        Defaults to PHRASES_PATH.
+
+    Returns:
+        FrozenPhrases: frozen bigrams model.
+    """
+    from gensim.models.phrases import FrozenPhrases
+
+    return FrozenPhrases.load(filename)
+
+
+def add_bigrams_to_store(
+    store: TokenStore,
+    phrases: 'FrozenPhrases',
+) -> TokenStore:
+    """Adds the bigrams of a frozen model at the end of the tokens of each
+    quote of a token store, for all the quotes at once.
+
+    Args:
+        store (TokenStore): token store.
+        phrases (FrozenPhrases): frozen bigrams model.
+
+    Returns:
+        TokenStore: token store with the bigrams.
+    """
+    bigrams = [
+        phrase for phrase, score in phrases.phrasegrams.items()
+        if score > phrases.threshold
+    ]
+    return add_phrases(store, bigrams, phrases.delimiter)
+
+
+def add_bigrams(
+    df: pd.DataFrame,
+    phrases: 'FrozenPhrases' = None,
+    min_count: int = 15,
+    chunksize: int = 100_000,
+) -> None:
     """Adds bigrams to the tokens list.
 
     Args:
         df (pd.DataFrame): dataframe with `tokens` column.
+        phrases (FrozenPhrases, optional): frozen bigrams model, e.g. loaded
+        with `load_phrases`. Defaults to None (trained on the dataframe).
+        min_count (int, optional): minimum count of a bigram to train the
+        model. Defaults to 15.
+        chunksize (int, optional): number of quotes per chunk to train the
+        model. Defaults to 100000.
     """
     assert TOKENS_COL in df.columns
 
-    # Add bigrams to docs (only ones that appear 15 times or more).
-    bigrams = Phrases(df[TOKENS_COL], min_count=15)
-    df[TOKENS_COL] = df[TOKENS_COL].progress_apply(
-        lambda x: add_bigrams_to_list(x, bigrams)
-    )
+    if phrases is None:
+        tokens = df[TOKENS_COL]
+        phrases = train_phrases(
+            (
+                tokens.iloc[i:i + chunksize]
+                for i in range(0, len(tokens), chunksize)
+            ),
+            min_count=min_count,
+        )
+
+    # New lists of tokens, the lists of the dataframe are not modified
+    store = add_bigrams_to_store(create_token_store(df[TOKENS_COL]), phrases)
+    df[TOKENS_COL] = get_tokens_series(store)
 
 
 def create_dictionary_from_words(
     words: list,
     verbose: bool = False,
-) -> Dictionary:
+) -> 'Dictionary':
     """Creates a dictionary from a list of words.
 
     Args:
@@ -134,6 +655,8 @@ def create_dictionary_from_words(
     Returns:
         Dictionary: Dictionary object.
     """
+    from gensim.corpora import Dictionary
+
     dictionary = Dictionary(words)
 
     if verbose:
@@ -144,15 +667,18 @@ def create_dictionary_from_words(
     return dictionary
 
 
-def create_dictionary_from_tokens_col(
-    df: pd.DataFrame,
+def create_dictionary_from_token_store(
+    store: TokenStore,
     min_wordcount: int = 5,
     max_freq: float = 0.5
-) -> Dictionary:
-    """Creates a dictionary from the `tokens` column.
+) -> 'Dictionary':
+    """Creates a dictionary from a token store. The counts are computed on
+    the flat array of tokens instead of one document at a time, and the ids
+    are the ones given by `Dictionary(tokens)`: words ordered by first quote,
+    then alphabetically.
 
     Args:
-        df (pd.DataFrame): dataframe with `tokens` column.
+        store (TokenStore): token store.
         min_wordcount (int, optional): minimum word count allowed.
         Defaults to 5.
         max_freq (float, optional): maximum word frequency allowed.
@@ -161,10 +687,27 @@ def create_dictionary_from_tokens_col(
     Returns:
         Dictionary: Dictionary object.
     """
-    assert TOKENS_COL in df.columns
+    from gensim.corpora import Dictionary
 
-    # Create a dictionary representation of the documents.
-    dictionary = Dictionary(df[TOKENS_COL])
+    token_counts = count_tokens(store).to_numpy()
+    doc_counts = count_documents(store).to_numpy()
+
+    # First quote of each word of the vocabulary
+    first_docs = np.full(len(store.vocabulary), len(store))
+    word_ids, first_positions = np.unique(store.token_ids, return_index=True)
+    first_docs[word_ids] = get_doc_ids(store)[first_positions]
+    word_ranks, _ = pd.factorize(store.vocabulary, sort=True)
+    order = word_ids[np.lexsort((word_ranks[word_ids], first_docs[word_ids]))]
+
+    dictionary = Dictionary()
+    dictionary.token2id = dict(
+        zip(store.vocabulary[order].tolist(), range(len(order)))
+    )
+    dictionary.cfs = dict(enumerate(token_counts[order].tolist()))
+    dictionary.dfs = dict(enumerate(doc_counts[order].tolist()))
+    dictionary.num_docs = len(store)
+    dictionary.num_pos = len(store.token_ids)
+    dictionary.num_nnz = int(doc_counts.sum())
 
     # Filter out words that occur too frequently or too rarely.
     dictionary.filter_extremes(no_below=min_wordcount, no_above=max_freq)
@@ -172,56 +715,856 @@ def create_dictionary_from_tokens_col(
     return dictionary
 
 
-def add_col_bow(df: pd.DataFrame, dictionary: Dictionary) -> None:
+def create_dictionary_from_tokens_col(
+    df: pd.DataFrame,
+    min_wordcount: int = 5,
+    max_freq: float = 0.5,
+    store: TokenStore = None,
+) -> 'Dictionary':
+    """Creates a dictionary from the `tokens` column.
+
+    Args:
+        df (pd.DataFrame): dataframe with `tokens` column.
+        min_wordcount (int, optional): minimum word count allowed.
+        Defaults to 5.
+        max_freq (float, optional): maximum word frequency allowed.
+        Defaults to 0.5.
+        store (TokenStore, optional): token store of the quotes, with the
+        same index. Defaults to None (created from the `tokens` column).
+
+    Returns:
+        Dictionary: Dictionary object.
+    """
+    if store is None:
+        assert TOKENS_COL in df.columns
+        store = create_token_store(df[TOKENS_COL])
+
+    return create_dictionary_from_token_store(store, min_wordcount, max_freq)
+
+
+def add_col_bow(
+    df: pd.DataFrame,
+    dictionary: 'Dictionary',
+    store: TokenStore = None,
+) -> None:
     """Adds the column of Bag-of-words representation to a dataframe of quotes.
 
     Args:
         df (pd.DataFrame): dataframe with `tokens` column.
         dictionary (Dictionary): dictionary.
+        store (TokenStore, optional): token store of the quotes, with the
+        same index. Defaults to None (created from the `tokens` column).
     """
-    assert TOKENS_COL in df.columns
+    if store is None:
+        assert TOKENS_COL in df.columns
+        store = create_token_store(df[TOKENS_COL])
 
-    df[BOW_COL] = df[TOKENS_COL].progress_apply(dictionary.doc2bow)
+    df[BOW_COL] = get_bow_series(store, dictionary.token2id)
 
 
-def get_lda_model(df: pd.DataFrame, dictionary: Dictionary) -> LdaMulticore:
+def iter_bow_from_tokens(token_chunks, dictionary: 'Dictionary'):
+    """Yields the Bag-of-words representation of the quotes from chunks of
+    tokens, without keeping them in memory.
+
+    Args:
+        token_chunks: iterable of chunks of lists of tokens (lists, series,
+        token stores...).
+        dictionary (Dictionary): dictionary.
+
+    Yields:
+        list: Bag-of-words of a quote.
+    """
+    for chunk in token_chunks:
+        if isinstance(chunk, TokenStore):
+            yield from get_bow_series(chunk, dictionary.token2id)
+        else:
+            yield from map(dictionary.doc2bow, chunk)
+
+
+def get_dictionary_hasher(dictionary: 'Dictionary'):
+    """Returns a hasher initialized with the vocabulary of a dictionary.
+
+    Args:
+        dictionary (Dictionary): dictionary.
+
+    Returns:
+        hashlib.blake2b: hasher of the fingerprint.
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(json.dumps(sorted(dictionary.token2id.items())).encode())
+    return hasher
+
+
+def iter_hashed_bows(bows, hasher, chunksize: int = FINGERPRINT_CHUNKSIZE):
+    """Yields the Bag-of-words of a corpus while adding their lengths and
+    (id, count) pairs to a hasher, one chunk at a time.
+
+    Args:
+        bows: iterable of Bag-of-words.
+        hasher (hashlib.blake2b): hasher of the fingerprint.
+        chunksize (int, optional): number of Bag-of-words hashed at a time.
+        Defaults to FINGERPRINT_CHUNKSIZE.
+
+    Yields:
+        list: Bag-of-words of a quote.
+    """
+    bows = iter(bows)
+    while chunk := list(islice(bows, chunksize)):
+        lengths = np.fromiter(map(len, chunk), np.int64, len(chunk))
+        pairs = np.fromiter(
+            chain.from_iterable(chain.from_iterable(chunk)), np.int64,
+        )
+        hasher.update(lengths.tobytes())
+        hasher.update(pairs.tobytes())
+        yield from chunk
+
+
+def get_corpus_fingerprint(bows, dictionary: 'Dictionary') -> str:
+    """Returns the fingerprint of a Bag-of-words corpus and its dictionary,
+    without serializing it.
+
+    Args:
+        bows: iterable of Bag-of-words (e.g. `bow` column).
+        dictionary (Dictionary): dictionary.
+
+    Returns:
+        str: hexadecimal hash.
+    """
+    hasher = get_dictionary_hasher(dictionary)
+    for _ in iter_hashed_bows(bows, hasher):
+        pass
+    return hasher.hexdigest()
+
+
+def serialize_corpus(
+    bows,
+    dictionary: 'Dictionary',
+    cache_dir: str = LDA_DIR,
+    fingerprint: str = None,
+) -> str:
+    """Serializes a Bag-of-words corpus in the Matrix Market format, with its
+    dictionary, in a directory of the cache named after its fingerprint. The
+    corpus can then be streamed from the disk with `load_corpus`.
+
+    Args:
+        bows: iterable of Bag-of-words (e.g. `bow` column or
+        `iter_bow_from_tokens`).
+        dictionary (Dictionary): dictionary.
+        cache_dir (str, optional): directory of the cache.
+        Defaults to LDA_DIR.
+        fingerprint (str, optional): fingerprint of the corpus (see
+        `get_corpus_fingerprint`), the corpus is not serialized again if it
+        is already in the cache. Defaults to None (computed while
+        serializing).
+
+    Returns:
+        str: directory of the corpus.
+    """
+    if fingerprint is not None:
+        corpus_dir = os.path.join(cache_dir, fingerprint)
+        if os.path.isdir(corpus_dir):
+            return corpus_dir
+
+    from gensim.corpora import MmCorpus
+
+    hasher = get_dictionary_hasher(dictionary)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=cache_dir)
+    try:
+        corpus_filename = os.path.join(tmp_dir, CORPUS_FILENAME)
+        MmCorpus.serialize(
+            corpus_filename,
+            iter_hashed_bows(bows, hasher),
+            id2word=dictionary,
+        )
+        dictionary.save(os.path.join(tmp_dir, DICTIONARY_FILENAME))
+        if fingerprint is None:
+            fingerprint = hasher.hexdigest()
+
+        # Keep the corpus already in the cache and its models
+        corpus_dir = os.path.join(cache_dir, fingerprint)
+        if not os.path.isdir(corpus_dir):
+            os.rename(tmp_dir, corpus_dir)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return corpus_dir
+
+
+def load_corpus(corpus_dir: str) -> tuple:
+    """Loads a serialized corpus, streamed from the disk, and its dictionary.
+
+    Args:
+        corpus_dir (str): directory of the corpus.
+
+    Returns:
+        tuple: MmCorpus, Dictionary
+    """
+    from gensim.corpora import Dictionary, MmCorpus
+
+    corpus = MmCorpus(os.path.join(corpus_dir, CORPUS_FILENAME))
+    dictionary = Dictionary.load(os.path.join(corpus_dir, DICTIONARY_FILENAME))
+    return corpus, dictionary
+
+
+def get_lda_model_filename(corpus_dir: str, params: dict) -> str:
+    """Returns the path of a LDA model trained on a serialized corpus.
+
+    Args:
+        corpus_dir (str): directory of the corpus.
+        params (dict): parameters of the model.
+
+    Returns:
+        str: path to the model.
+    """
+    key = ','.join(f'{name}={value}' for name, value in sorted(params.items()))
+    return os.path.join(corpus_dir, f'lda-{key}.model')
+
+
+def get_updated_lda_model_filename(corpus_dir: str, model_filename: str) \
+        -> str:
+    """Returns the path of a LDA model updated on a serialized corpus of
+    new documents. It is not one of the cached models of the corpus, keyed on
+    the parameters, as the updated model also saw the previous documents.
+
+    Args:
+        corpus_dir (str): directory of the corpus of the new documents.
+        model_filename (str): path to the model before the update.
+
+    Returns:
+        str: path to the updated model.
+    """
+    key = hashlib.blake2b(
+        os.path.abspath(model_filename).encode(), digest_size=8
+    ).hexdigest()
+    return os.path.join(corpus_dir, f'update-{key}.model')
+
+
+def train_lda_model(
+    corpus,
+    dictionary: 'Dictionary',
+    num_topics: int = 100,
+    workers: int = None,
+    chunksize: int = 2000,
+    passes: int = 1,
+    random_state: int = 0,
+    **kwargs,
+) -> 'LdaMulticore':
+    """Trains a LdaMulticore model on a streamed corpus.
+
+    Args:
+        corpus: Bag-of-words corpus (e.g. MmCorpus).
+        dictionary (Dictionary): dictionary.
+        num_topics (int, optional): number of topics. Defaults to 100.
+        workers (int, optional): number of worker processes. Defaults to None
+        (number of processors - 1).
+        chunksize (int, optional): number of documents per training chunk.
+        Defaults to 2000.
+        passes (int, optional): number of passes over the corpus.
+        Defaults to 1.
+        random_state (int, optional): random seed. Defaults to 0.
+        **kwargs: other parameters of LdaMulticore (alpha, eta...).
+
+    Returns:
+        LdaMulticore: LdaMulticore object.
+    """
+    from gensim.models import LdaMulticore
+
+    return LdaMulticore(
+        corpus=corpus,
+        id2word=dictionary,
+        num_topics=num_topics,
+        workers=workers,
+        chunksize=chunksize,
+        passes=passes,
+        random_state=random_state,
+        **kwargs,
+    )
+
+
+def get_documents_range(
+    start: int,
+    n_docs: int,
+    corpus_dir: str,
+    label: str = None,
+) -> dict:
+    """Returns the metadata of a range of documents seen by a LDA model.
+
+    Args:
+        start (int): position of the first document in all the documents
+        seen by the model.
+        n_docs (int): number of documents.
+        corpus_dir (str): directory of the serialized corpus.
+        label (str, optional): label of the documents (e.g. month of the
+        Quotebank dump). Defaults to None.
+
+    Returns:
+        dict: range of documents.
+    """
+    return {
+        'start': start,
+        'stop': start + n_docs,
+        'corpus': os.path.basename(os.path.normpath(corpus_dir)),
+        'label': label,
+    }
+
+
+def save_lda_metadata(model_filename: str, metadata: dict) -> None:
+    """Saves the metadata of a LDA model next to the model.
+
+    Args:
+        model_filename (str): path to the model.
+        metadata (dict): metadata (parameters, ranges of documents seen).
+    """
+    with open(f'{model_filename}.json', 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+
+def load_lda_metadata(model_filename: str) -> dict:
+    """Loads the metadata of a LDA model.
+
+    Args:
+        model_filename (str): path to the model.
+
+    Returns:
+        dict: metadata (parameters, ranges of documents seen).
+    """
+    with open(f'{model_filename}.json') as f:
+        return json.load(f)
+
+
+def get_cached_lda_model(corpus_dir: str, **params) -> 'LdaMulticore':
+    """Returns the LDA model of a serialized corpus, loaded from the cache if
+    it was already trained with the same parameters, trained and saved
+    otherwise.
+
+    Args:
+        corpus_dir (str): directory of the corpus (see `serialize_corpus`).
+        **params: parameters of `train_lda_model`.
+
+    Returns:
+        LdaMulticore: LdaMulticore object.
+    """
+    from gensim.models import LdaMulticore
+
+    filename = get_lda_model_filename(corpus_dir, params)
+    if os.path.exists(filename):
+        return LdaMulticore.load(filename)
+
+    corpus, dictionary = load_corpus(corpus_dir)
+    lda_model = train_lda_model(corpus, dictionary, **params)
+    lda_model.save(filename)
+    save_lda_metadata(filename, {
+        'params': params,
+        'ranges': [get_documents_range(0, len(corpus), corpus_dir)],
+    })
+    return lda_model
+
+
+def get_lda_model(
+    df: pd.DataFrame,
+    dictionary: 'Dictionary',
+    num_topics: int = 100,
+    workers: int = None,
+    chunksize: int = 2000,
+    passes: int = 1,
+    cache_dir: str = LDA_DIR,
+    fingerprint: str = None,
+) -> 'LdaMulticore':
     """Returns the LdaMulticore object for a dataframe with a `bow` column.
 
+    The corpus is serialized on the disk and streamed to the model, which is
+    cached with its dictionary and reloaded by the next calls with the same
+    corpus and parameters. The cache is keyed on a fingerprint of the
+    Bag-of-words, so a cached corpus is not serialized again.
+
     Args:
         df (pd.DataFrame): dataframe with `bow` column.
         dictionary (Dictionary): dictionary.
+        num_topics (int, optional): number of topics. Defaults to 100.
+        workers (int, optional): number of worker processes. Defaults to None
+        (number of processors - 1).
+        chunksize (int, optional): number of documents per training chunk.
+        Defaults to 2000.
+        passes (int, optional): number of passes over the corpus.
+        Defaults to 1.
+        cache_dir (str, optional): directory of the cache.
+        Defaults to LDA_DIR.
+        fingerprint (str, optional): fingerprint of the corpus, e.g. saved
+        from a previous `get_corpus_fingerprint`. Defaults to None (computed
+        from the `bow` column).
 
     Returns:
         LdaMulticore: LdaMulticore object.
     """
     assert BOW_COL in df.columns
 
-    return LdaMulticore(
-        corpus=df[BOW_COL],
-        id2word=dictionary,
-        random_state=0
+    if fingerprint is None:
+        fingerprint = get_corpus_fingerprint(df[BOW_COL], dictionary)
+    corpus_dir = serialize_corpus(
+        df[BOW_COL], dictionary, cache_dir, fingerprint,
+    )
+    return get_cached_lda_model(
+        corpus_dir,
+        num_topics=num_topics,
+        workers=workers,
+        chunksize=chunksize,
+        passes=passes,
+    )
+
+
+def get_lda_model_from_tokens(
+    token_chunks,
+    dictionary: 'Dictionary',
+    num_topics: int = 100,
+    workers: int = None,
+    chunksize: int = 2000,
+    passes: int = 1,
+    cache_dir: str = LDA_DIR,
+) -> 'LdaMulticore':
+    """Returns the LdaMulticore object for chunks of tokens, e.g.
+    `iter_tokens_from_parquet()` for all the newspapers. The Bag-of-words
+    of the quotes are never all in memory.
+
+    Args:
+        token_chunks: iterable of chunks of lists of tokens (lists, series,
+        token stores...).
+        dictionary (Dictionary): dictionary.
+        num_topics (int, optional): number of topics. Defaults to 100.
+        workers (int, optional): number of worker processes. Defaults to None
+        (number of processors - 1).
+        chunksize (int, optional): number of documents per training chunk.
+        Defaults to 2000.
+        passes (int, optional): number of passes over the corpus.
+        Defaults to 1.
+        cache_dir (str, optional): directory of the cache.
+        Defaults to LDA_DIR.
+
+    Returns:
+        LdaMulticore: LdaMulticore object.
+    """
+    bows = iter_bow_from_tokens(token_chunks, dictionary)
+    corpus_dir = serialize_corpus(bows, dictionary, cache_dir)
+    return get_cached_lda_model(
+        corpus_dir,
+        num_topics=num_topics,
+        workers=workers,
+        chunksize=chunksize,
+        passes=passes,
+    )
+
+
+def train_sweep_model(
+    corpus_dir: str,
+    params: dict,
+    coherence: str = 'u_mass',
+) -> dict:
+    """Trains (or loads from the cache) a single-process LDA model of a
+    sweep on a serialized corpus and computes its coherence.
+
+    Args:
+        corpus_dir (str): directory of the corpus (see `serialize_corpus`).
+        params (dict): parameters of LdaModel.
+        coherence (str, optional): coherence measure computed from the
+        Bag-of-words. Defaults to 'u_mass'.
+
+    Returns:
+        dict: parameters, coherence, training duration and path of the model.
+    """
+    from gensim.models import CoherenceModel, LdaModel
+
+    corpus, dictionary = load_corpus(corpus_dir)
+    filename = get_lda_model_filename(corpus_dir, params)
+
+    start = time.perf_counter()
+    if os.path.exists(filename):
+        lda_model = LdaModel.load(filename)
+    else:
+        lda_model = LdaModel(corpus=corpus, id2word=dictionary, **params)
+        lda_model.save(filename)
+        save_lda_metadata(filename, {
+            'params': params,
+            'ranges': [get_documents_range(0, len(corpus), corpus_dir)],
+        })
+    duration = time.perf_counter() - start
+
+    coherence_model = CoherenceModel(
+        model=lda_model,
+        corpus=corpus,
+        dictionary=dictionary,
+        coherence=coherence,
+    )
+    return {
+        **params,
+        'coherence': coherence_model.get_coherence(),
+        'time (s)': duration,
+        'filename': filename,
+    }
+
+
+def sweep_lda_models(
+    corpus_dir: str,
+    param_grid: dict,
+    chunksize: int = 2000,
+    random_state: int = 0,
+    coherence: str = 'u_mass',
+    max_workers: int = None,
+) -> pd.DataFrame:
+    """Trains the LDA models of a grid of parameters in a process pool, one
+    single-process model per worker. All the workers stream the same
+    serialized corpus from the disk, so the memory does not grow with the
+    size of the corpus.
+
+    The results table and the model with the best coherence are saved in
+    the directory of the corpus.
+
+    Args:
+        corpus_dir (str): directory of the corpus (see `serialize_corpus`).
+        param_grid (dict): lists of values by parameter of LdaModel, e.g.
+        {'num_topics': [10, 20], 'alpha': ['symmetric', 'auto'],
+        'passes': [1, 5]}.
+        chunksize (int, optional): number of documents per training chunk.
+        Defaults to 2000.
+        random_state (int, optional): random seed. Defaults to 0.
+        coherence (str, optional): coherence measure computed from the
+        Bag-of-words. Defaults to 'u_mass'.
+        max_workers (int, optional): number of processes. Defaults to None
+        (number of processors).
+
+    Returns:
+        pd.DataFrame: parameters, coherence, training duration and path of
+        each model, from the best coherence.
+    """
+    from gensim.models import LdaModel
+
+    names = list(param_grid)
+    grid = [
+        {
+            **dict(zip(names, values)),
+            'chunksize': chunksize,
+            'random_state': random_state,
+        }
+        for values in product(*param_grid.values())
+    ]
+
+    results = list()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(train_sweep_model, corpus_dir, params, coherence)
+            for params in grid
+        ]
+        for future in tqdm(
+            as_completed(futures),
+            total=len(futures),
+            desc='LDA sweep',
+            unit='model',
+        ):
+            results.append(future.result())
+
+    df_results = pd.DataFrame(results)
+    df_results.sort_values('coherence', ascending=False, inplace=True)
+    df_results.reset_index(drop=True, inplace=True)
+    df_results.to_csv(
+        os.path.join(corpus_dir, SWEEP_RESULTS_FILENAME), index=False
+    )
+
+    best_filename = df_results.loc[0, 'filename']
+    best_model = LdaModel.load(best_filename)
+    best_model.save(os.path.join(corpus_dir, BEST_MODEL_FILENAME))
+    save_lda_metadata(
+        os.path.join(corpus_dir, BEST_MODEL_FILENAME),
+        load_lda_metadata(best_filename),
     )
+    return df_results
+
+
+def update_dictionary(
+    dictionary: 'Dictionary',
+    stores: list,
+    no_below: int = 5,
+    max_new_tokens: int = 1000,
+) -> list:
+    """Updates a dictionary with new documents. The counts of the known words
+    are updated, and only the most frequent new words are added, with ids
+    after the existing ones.
+
+    Args:
+        dictionary (Dictionary): dictionary, updated in place.
+        stores (list): token stores of the new documents.
+        no_below (int, optional): minimum number of new documents containing
+        a new word. Defaults to 5.
+        max_new_tokens (int, optional): maximum number of new words.
+        Defaults to 1000.
+
+    Returns:
+        list: new words.
+    """
+    doc_counts = Counter()
+    token_counts = Counter()
+    for store in stores:
+        doc_counts.update(count_documents(store).to_dict())
+        token_counts.update(count_tokens(store).to_dict())
+        dictionary.num_docs += len(store)
+        dictionary.num_pos += len(store.token_ids)
+
+    new_words = [
+        word for word, count in doc_counts.most_common()
+        if word not in dictionary.token2id and count >= no_below
+    ][:max_new_tokens]
+    for word in new_words:
+        dictionary.token2id[word] = len(dictionary.token2id)
+    dictionary.id2token = dict()
+
+    for word, count in doc_counts.items():
+        word_id = dictionary.token2id.get(word)
+        if word_id is not None:
+            dictionary.dfs[word_id] = dictionary.dfs.get(word_id, 0) + count
+            dictionary.cfs[word_id] = (
+                dictionary.cfs.get(word_id, 0) + token_counts[word]
+            )
+            dictionary.num_nnz += count
+
+    return new_words
+
+
+def add_lda_terms(lda_model: 'LdaMulticore', num_terms: int) -> None:
+    """Extends the topics of a LDA model to new words. The new words start
+    with the mean prior of the words and no observation.
+
+    Args:
+        lda_model (LdaMulticore): LDA model, updated in place.
+        num_terms (int): new number of words.
+    """
+    n_new = num_terms - lda_model.num_terms
+    if n_new <= 0:
+        return
+
+    eta = lda_model.eta
+    new_eta = np.repeat(eta.mean(axis=-1, keepdims=True), n_new, axis=-1)
+    lda_model.eta = np.concatenate([eta, new_eta], axis=-1).astype(eta.dtype)
+    lda_model.state.eta = lda_model.eta
+
+    sstats = lda_model.state.sstats
+    new_sstats = np.zeros((sstats.shape[0], n_new), dtype=sstats.dtype)
+    lda_model.state.sstats = np.concatenate([sstats, new_sstats], axis=1)
+
+    lda_model.num_terms = num_terms
+    lda_model.sync_state()
+
+
+def update_lda_model(
+    model_filename: str,
+    token_chunks,
+    label: str = None,
+    no_below: int = 5,
+    max_new_tokens: int = 1000,
+    workers: int = None,
+    chunksize: int = None,
+    passes: int = None,
+    cache_dir: str = LDA_DIR,
+    output_filename: str = None,
+) -> 'LdaMulticore':
+    """Updates a saved LDA model with new documents only (e.g. a new month of
+    quotes), instead of training it again on all the documents.
+
+    The dictionary of the model is extended with the most frequent new words,
+    the Bag-of-words of the new documents are serialized in the cache and the
+    model is updated on them. The range of the new documents is added to the
+    metadata of the model. The model before the update, which may be a cached
+    model of another corpus, is left unchanged.
+
+    Args:
+        model_filename (str): path to the model.
+        token_chunks: iterable of chunks of lists of tokens (lists, series,
+        token stores...) of the new documents.
+        label (str, optional): label of the new documents (e.g. month of the
+        Quotebank dump). Defaults to None.
+        no_below (int, optional): minimum number of new documents containing
+        a new word. Defaults to 5.
+        max_new_tokens (int, optional): maximum number of new words.
+        Defaults to 1000.
+        workers (int, optional): number of worker processes. Defaults to None
+        (value of the model).
+        chunksize (int, optional): number of documents per training chunk.
+        Defaults to None (value of the model).
+        passes (int, optional): number of passes over the new documents.
+        Defaults to None (value of the model).
+        cache_dir (str, optional): directory of the cache.
+        Defaults to LDA_DIR.
+        output_filename (str, optional): path to the updated model.
+        Defaults to None (saved in the directory of the new corpus, see
+        `get_updated_lda_model_filename`).
+
+    Returns:
+        LdaMulticore: updated LdaMulticore object.
+    """
+    from gensim.models import LdaMulticore
+
+    lda_model = LdaMulticore.load(model_filename)
+    metadata = load_lda_metadata(model_filename)
+    dictionary = lda_model.id2word
+
+    # New documents kept as compact token stores for the two passes
+    stores = [
+        chunk if isinstance(chunk, TokenStore)
+        else create_token_store(pd.Series(list(chunk), dtype=object))
+        for chunk in token_chunks
+    ]
+    update_dictionary(dictionary, stores, no_below, max_new_tokens)
+    add_lda_terms(lda_model, len(dictionary))
+
+    bows = iter_bow_from_tokens(stores, dictionary)
+    corpus_dir = serialize_corpus(bows, dictionary, cache_dir)
+    corpus, _ = load_corpus(corpus_dir)
+
+    for name, value in [
+        ('workers', workers), ('chunksize', chunksize), ('passes', passes),
+    ]:
+        if value is not None:
+            setattr(lda_model, name, value)
+    lda_model.update(corpus)
+
+    start = metadata['ranges'][-1]['stop'] if metadata['ranges'] else 0
+    metadata['ranges'].append(
+        get_documents_range(start, len(corpus), corpus_dir, label)
+    )
+    if output_filename is None:
+        output_filename = get_updated_lda_model_filename(
+            corpus_dir, model_filename
+        )
+    lda_model.save(output_filename)
+    save_lda_metadata(output_filename, metadata)
+    return lda_model
+
+
+def get_category_key(topic_name: str, seed_words: list, size: int) -> str:
+    """Returns the key of an Empath category in the lexicon file.
+
+    Args:
+        topic_name (str): name of the topic.
+        seed_words (list): seed words to generate vocabulary.
+        size (int): number of generated words.
+
+    Returns:
+        str: key of the category.
+    """
+    return json.dumps([topic_name, sorted(seed_words), size, LEXICON_MODEL])
+
+
+def load_lexicon_file(filename: str = LEXICON_PATH) -> dict:
+    """Loads the saved Empath categories.
+
+    Args:
+        filename (str, optional): path to the json file.
+        Defaults to LEXICON_PATH.
+
+    Returns:
+        dict: categories by key, empty if the file does not exist or has
+        another version.
+    """
+    if not os.path.exists(filename):
+        return dict()
+    with open(filename) as f:
+        data = json.load(f)
+    if data.get('version') != LEXICON_VERSION:
+        return dict()
+    return data['categories']
+
+
+def save_lexicon_file(categories: dict, filename: str = LEXICON_PATH) -> None:
+    """Saves the Empath categories.
+
+    Args:
+        categories (dict): categories by key.
+        filename (str, optional): path to the json file.
+        Defaults to LEXICON_PATH.
+    """
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    tmp_filename = f'{filename}.tmp'
+    with open(tmp_filename, 'w') as f:
+        json.dump(
+            {'version': LEXICON_VERSION, 'categories': categories},
+            f,
+            indent=2,
+        )
+    os.replace(tmp_filename, filename)
+
+
+def get_lexicon_vocabularies(
+    topics_dict: dict = TOPICS_DICT,
+    size: int = 500,
+    filename: str = LEXICON_PATH,
+) -> dict:
+    """Returns the vocabularies of topics generated by Empath. The
+    vocabularies are read from the lexicon file, and only the missing ones
+    are requested to the Empath server, then saved in the file.
+
+    Args:
+        topics_dict (dict, optional): dictionary of topics and seed words.
+        Defaults to TOPICS_DICT.
+        size (int, optional): number of generated words. Defaults to 500.
+        filename (str, optional): path to the json file.
+        Defaults to LEXICON_PATH.
+
+    Returns:
+        dict: lists of words by topic.
+    """
+    categories = load_lexicon_file(filename)
+    vocabularies = dict()
+    lexicon = None
+    for topic_name, seed_words in topics_dict.items():
+        key = get_category_key(topic_name, seed_words, size)
+        if key not in categories:
+            print('Topic:', topic_name)
+            if lexicon is None:
+                from empath import Empath
+
+                lexicon = Empath()
+            lexicon.create_category(
+                topic_name,
+                seed_words,
+                model=LEXICON_MODEL,
+                size=size,
+                write=False,
+            )
+            categories[key] = {
+                'topic': topic_name,
+                'seeds': list(seed_words),
+                'size': size,
+                'model': LEXICON_MODEL,
+                'words': sorted(lexicon.cats[topic_name]),
+            }
+        vocabularies[topic_name] = categories[key]['words']
+
+    if lexicon is not None:
+        save_lexicon_file(categories, filename)
+
+    return vocabularies
 
 
 def create_vocabulary_with_empath(
     topic_name: str,
     seed_words: list,
     size: int = 500,
+    filename: str = LEXICON_PATH,
 ) -> list:
-    """Creates a vocabulary list about a topic using empath.
+    """Creates a vocabulary list about a topic using empath. The vocabulary
+    is only generated once, then read from the lexicon file.
 
     Args:
         topic_name (str): name of the topic.
         seed_words (list): seed words to generate vocabulary.
         size (int, optional): number of generated words. Defaults to 500.
+        filename (str, optional): path to the lexicon file.
+        Defaults to LEXICON_PATH.
 
     Returns:
         list: list of words about the topic.
     """
-    lexicon = Empath()
-    lexicon.create_category(topic_name, seed_words, model='nytimes', size=size)
-    vocabulary = lexicon.cats[topic_name]
-    return vocabulary
+    vocabularies = get_lexicon_vocabularies(
+        {topic_name: seed_words}, size, filename
+    )
+    return vocabularies[topic_name]
 
 
 def get_tfidf_matrix(
@@ -239,6 +1582,8 @@ def get_tfidf_matrix(
     Returns:
         csr_matrix: TF-IDF matrix.
     """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
     tfidf_vectorizer = TfidfVectorizer(vocabulary=vocabulary)
     tfidf_matrix = tfidf_vectorizer.fit_transform(df[text_col])
     return tfidf_matrix
@@ -257,6 +1602,8 @@ def reduce_tfidf_matrix(
     Returns:
         tuple: TF-IDF matrix reduced, explained variance ratio
     """
+    from sklearn.decomposition import TruncatedSVD
+
     truncatedSVD = TruncatedSVD(
         n_components=n_components, n_iter=10, random_state=0,
     )
@@ -264,28 +1611,33 @@ def reduce_tfidf_matrix(
     return tfidf_matrix_reduced, truncatedSVD.explained_variance_ratio_
 
 
-def create_lexicon(topics_dict: dict = TOPICS_DICT, size: int = 500) -> Empath:
+def create_lexicon(
+    topics_dict: dict = TOPICS_DICT,
+    size: int = 500,
+    filename: str = LEXICON_PATH,
+) -> 'Empath':
     """Creates a lexicon with empath from a dictionary of topics and seed
-    words.
+    words. The categories are only generated once, then read from the
+    lexicon file without any network call.
 
     Args:
         topics_dict (dict, optional): dictionary of topics and seed words.
         Defaults to TOPICS_DICT.
         size (int, optional): number of generated words. Defaults to 500.
+        filename (str, optional): path to the lexicon file.
+        Defaults to LEXICON_PATH.
 
     Returns:
         Empath: lexicon.
     """
+    from empath import Empath
+
     lexicon = Empath()
-    for topic_name, seed_words in topics_dict.items():
-        print('Topic:', topic_name)
-        lexicon.create_category(
-            topic_name, seed_words, model='nytimes', size=size
-        )
+    lexicon.cats.update(get_lexicon_vocabularies(topics_dict, size, filename))
     return lexicon
 
 
-def get_topics_list(tokens: list, lexicon: Empath, categories: list) -> list:
+def get_topics_list(tokens: list, lexicon: 'Empath', categories: list) -> list:
     """Returns the list of topics from a list of tokens and a lexicon.
 
     Args:
@@ -300,10 +1652,90 @@ def get_topics_list(tokens: list, lexicon: Empath, categories: list) -> list:
     return [topic for topic in result if result[topic] > 0]
 
 
+def get_term_topic_matrix(
+    lexicon: 'Empath',
+    categories: list,
+    vocabulary: np.ndarray,
+) -> csr_matrix:
+    """Returns the sparse matrix of the words of the lexicon categories
+    (words x topics), over a vocabulary of tokens.
+
+    The cell of a word and a topic is the number of times `lexicon.analyze`
+    counts the topic for the word: a token with whitespaces is split like
+    Empath does.
+
+    Args:
+        lexicon (Empath): lexicon.
+        categories (list): list of topics.
+        vocabulary (np.ndarray): words of the tokens.
+
+    Returns:
+        csr_matrix: matrix of counts.
+    """
+    categories = list(categories)
+
+    # Topics of each word of the lexicon (a word can be repeated in a topic)
+    word_topics = defaultdict(list)
+    for topic_id, topic in enumerate(categories):
+        for word in lexicon.cats[topic]:
+            word_topics[word].append(topic_id)
+
+    rows = list()
+    cols = list()
+    for word_id, token in enumerate(vocabulary):
+        for word in token.split():
+            topic_ids = word_topics.get(word, [])
+            rows.extend([word_id] * len(topic_ids))
+            cols.extend(topic_ids)
+
+    matrix = csr_matrix(
+        (np.ones(len(rows), dtype=np.int32), (rows, cols)),
+        shape=(len(vocabulary), len(categories)),
+    )
+    matrix.sum_duplicates()
+    return matrix
+
+
+def get_topics(
+    store: TokenStore,
+    lexicon: 'Empath',
+    categories: list,
+) -> tuple:
+    """Returns the topics of all the quotes of a token store at once, with a
+    single sparse product of the matrix of counts of the tokens and of the
+    matrix of the words of the topics.
+
+    Args:
+        store (TokenStore): token store.
+        lexicon (Empath): lexicon.
+        categories (list): list of topics.
+
+    Returns:
+        tuple: lists of topics of the quotes (like `get_topics_list`),
+        matrix of the counts of the topics (quotes x topics).
+    """
+    categories = list(categories)
+    term_topic_matrix = get_term_topic_matrix(
+        lexicon, categories, store.vocabulary
+    )
+    topic_counts = get_csr_matrix(store) @ term_topic_matrix
+    topic_counts.eliminate_zeros()
+    topic_counts.sort_indices()
+
+    indptr = topic_counts.indptr
+    names = np.asarray(categories, dtype=object)[topic_counts.indices]
+    names = names.tolist()
+    topics = [
+        names[start:end] for start, end in zip(indptr[:-1], indptr[1:])
+    ]
+    return pd.Series(topics, index=store.index, dtype=object), topic_counts
+
+
 def add_topics_col(
     df: pd.DataFrame,
-    lexicon: Empath,
+    lexicon: 'Empath',
     categories: list,
+    store: TokenStore = None,
 ) -> None:
     """Adds the column of topics to a dataframe of quotes. It corresponds to
     a list of topics about a quote.
@@ -312,15 +1744,54 @@ def add_topics_col(
         df (pd.DataFrame): dataframe with `tokens` column.
         lexicon (Empath): lexicon from Empath.
         categories (list): list of topics.
+        store (TokenStore, optional): token store of the quotes, with the
+        same index. Defaults to None (created from the `tokens` column).
     """
-    assert TOKENS_COL in df.columns
+    if store is None:
+        assert TOKENS_COL in df.columns
+        store = create_token_store(df[TOKENS_COL])
+
+    df[TOPICS_COL], _ = get_topics(store, lexicon, categories)
+
+
+def get_topic_membership(df: pd.DataFrame, categories: list) -> csr_matrix:
+    """Returns the boolean sparse matrix of the topics of the quotes (quotes x
+    topics) from the `topics` column.
+
+    Args:
+        df (pd.DataFrame): dataframe with `topics` column.
+        categories (list): list of topics.
 
-    df[TOPICS_COL] = df[TOKENS_COL].progress_apply(
-        lambda x: get_topics_list(x, lexicon, categories)
+    Returns:
+        csr_matrix: matrix of topics.
+    """
+    assert TOPICS_COL in df.columns
+
+    categories = list(categories)
+    topics = df[TOPICS_COL]
+    lengths = np.fromiter(map(len, topics), dtype=np.int64, count=len(topics))
+    rows = np.repeat(np.arange(len(topics)), lengths)
+    flat_topics = np.fromiter(
+        chain.from_iterable(topics), dtype=object, count=lengths.sum()
+    )
+    cols = pd.Index(categories).get_indexer(flat_topics)
+
+    # Ignore the topics that are not in the categories
+    known = cols != -1
+    matrix = csr_matrix(
+        (np.ones(known.sum(), dtype=bool), (rows[known], cols[known])),
+        shape=(len(topics), len(categories)),
     )
+    matrix.sum_duplicates()
+    return matrix
 
 
-def create_df_topics(df: pd.DataFrame, categories: list) -> pd.DataFrame:
+def create_df_topics(
+    df: pd.DataFrame,
+    categories: list,
+    topic_matrix: csr_matrix = None,
+    sparse: bool = False,
+) -> pd.DataFrame:
     """Creates the dataframe of topics from a dataframe of quotes.
 
     It contains one column per topic, one row per quote. The cell for quote q
@@ -330,22 +1801,104 @@ def create_df_topics(df: pd.DataFrame, categories: list) -> pd.DataFrame:
     Args:
         df (pd.DataFrame): dataframe of quotes.
         categories (list): list of topics.
+        topic_matrix (csr_matrix, optional): matrix of the topics of the
+        quotes (quotes x categories), e.g. the counts of `get_topics`.
+        Defaults to None (created from the `topics` column).
+        sparse (bool, optional): True to return columns of SparseDtype (NaN
+        not stored). Defaults to False.
 
     Returns:
         pd.DataFrame: dataframe of topics.
     """
-    assert COMPOUND_SCORE_COL in df.columns and TOPICS_COL in df.columns
+    assert COMPOUND_SCORE_COL in df.columns
 
-    # Init dataframe
-    df_topics = pd.DataFrame()
+    if topic_matrix is None:
+        topic_matrix = get_topic_membership(df, categories)
+    topic_matrix = topic_matrix.tocsc()
+    topic_matrix.eliminate_zeros()
 
-    # Create each column
-    for topic in tqdm(categories, desc='Create df topics', unit='topic'):
-        colname = f"{topic.replace(' ', '_')}_{COMPOUND_SCORE_COL}"
-        df_topics[colname] = df.apply(
-            lambda x: x[COMPOUND_SCORE_COL] if topic in x[TOPICS_COL]
-            else np.nan,
-            axis=1
-        )
+    scores = df[COMPOUND_SCORE_COL].to_numpy(dtype=np.float64)
+    columns = [
+        f"{topic.replace(' ', '_')}_{COMPOUND_SCORE_COL}"
+        for topic in categories
+    ]
+
+    if not sparse:
+        values = np.full((len(df), len(categories)), np.nan)
+        rows, cols = topic_matrix.nonzero()
+        values[rows, cols] = scores[rows]
+        return pd.DataFrame(values, index=df.index, columns=columns)
+
+    # Rows of each topic read from the CSC column slice (indptr[i] to
+    # indptr[i + 1] of indices), densified one column at a time and
+    # compressed to a SparseArray, so at most one dense column is in memory
+    data = dict()
+    for i, colname in enumerate(columns):
+        rows = topic_matrix.indices[
+            topic_matrix.indptr[i]:topic_matrix.indptr[i + 1]
+        ]
+        values = np.full(len(df), np.nan)
+        values[rows] = scores[rows]
+        data[colname] = pd.arrays.SparseArray(values, fill_value=np.nan)
+    return pd.DataFrame(data, index=df.index)
+
+
+def benchmark_fast_tokenization(texts: list, lemma_lookup: dict) -> dict:
+    """Compares the fast tokenizer with the spaCy tokenizer: throughputs and
+    token-level agreement.
+
+    Args:
+        texts (list): texts or quotations.
+        lemma_lookup (dict): lemma by word.
 
-    return df_topics
+    Returns:
+        dict: throughputs in quotes per second, precision and recall of the
+        fast tokens against the spaCy tokens, and rate of identical quotes.
+    """
+    start = time.perf_counter()
+    tokens = get_tokens_batch(texts)
+    time_spacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tokens_fast = [get_tokens_fast(text, lemma_lookup) for text in texts]
+    time_fast = time.perf_counter() - start
+
+    # Multiset intersection of the tokens of each quote
+    n_common = sum(
+        sum((Counter(a) & Counter(b)).values())
+        for a, b in zip(tokens, tokens_fast)
+    )
+    n_spacy = sum(map(len, tokens))
+    n_fast = sum(map(len, tokens_fast))
+
+    return {
+        'spacy (quotes/s)': len(texts) / time_spacy,
+        'fast (quotes/s)': len(texts) / time_fast,
+        'speedup': time_spacy / time_fast,
+        'precision': n_common / n_fast if n_fast else 1.0,
+        'recall': n_common / n_spacy if n_spacy else 1.0,
+        'identical quotes': np.mean([
+            a == b for a, b in zip(tokens, tokens_fast)
+        ]),
+    }
+
+
+if __name__ == '__main__':
+    from .df_factory import create_df_test
+
+    quotes = create_df_test()[QUOTATION_COL].head(20_000).tolist()
+    print('Text preprocessing:')
+    for key, value in benchmark_clean_col_text(quotes).items():
+        print(f'{key}: {value}')
+
+    print('\nBatched tokenization:')
+    for key, value in benchmark_tokenization(quotes[:10_000]).items():
+        print(f'{key}: {value}')
+
+    # Lookup table learnt on other quotes than the evaluated ones
+    print('\nFast tokenization:')
+    lemma_lookup = create_lemma_lookup(quotes[10_000:])
+    for key, value in benchmark_fast_tokenization(
+        quotes[:10_000], lemma_lookup
+    ).items():
+        print(f'{key}: {value}')
@@ -0,0 +1,465 @@
+"""
+Compact storage of the tokens of quotes.
+
+Instead of one python list of python strings per quote, the tokens of all the
+quotes are stored as:
+- a vocabulary: array of the distinct tokens
+- token ids: one flat int32 array with the position of each token in the
+vocabulary
+- offsets: int64 array such that the tokens of quote i are
+`token_ids[offsets[i]:offsets[i + 1]]`
+
+The operations on the tokens (filtering, counting, bag-of-words) are numpy
+operations on the flat array instead of python loops over the quotes.
+"""
+from dataclasses import dataclass
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+from .constants import TOKENS_COL
+
+
+@dataclass
+class TokenStore:
+    """Tokens of quotes stored as a ragged int32 array."""
+    vocabulary: np.ndarray
+    token_ids: np.ndarray
+    offsets: np.ndarray
+    index: pd.Index
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+
+def create_token_store_from_arrow(tokens: pd.Series) -> TokenStore:
+    """Creates a token store from a series of Arrow-backed lists of tokens,
+    from the offsets and values of the Arrow array without creating python
+    objects. A missing list has no token.
+
+    Args:
+        tokens (pd.Series): lists of tokens (`pd.ArrowDtype`).
+
+    Returns:
+        TokenStore: token store with the same index.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    array = pa.chunked_array(tokens.array.__arrow_array__()).combine_chunks()
+    lengths = pc.list_value_length(array).fill_null(0).to_numpy()
+    offsets = np.zeros(len(tokens) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    # Words numbered by first occurrence, like pd.factorize
+    encoded = array.flatten().dictionary_encode()
+    vocabulary = encoded.dictionary.to_numpy(zero_copy_only=False)
+    return TokenStore(
+        vocabulary=vocabulary.astype(object),
+        token_ids=encoded.indices.to_numpy().astype(np.int32),
+        offsets=offsets,
+        index=tokens.index,
+    )
+
+
+def create_token_store(tokens: pd.Series) -> TokenStore:
+    """Creates a token store from a series of lists of tokens.
+
+    Args:
+        tokens (pd.Series): lists of tokens (python or Arrow-backed lists).
+
+    Returns:
+        TokenStore: token store with the same index.
+    """
+    if isinstance(tokens.dtype, pd.ArrowDtype):
+        return create_token_store_from_arrow(tokens)
+
+    lengths = np.fromiter(map(len, tokens), dtype=np.int64, count=len(tokens))
+    offsets = np.zeros(len(tokens) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    flat_tokens = np.fromiter(
+        chain.from_iterable(tokens), dtype=object, count=offsets[-1]
+    )
+    token_ids, vocabulary = pd.factorize(flat_tokens)
+    return TokenStore(
+        vocabulary=np.asarray(vocabulary, dtype=object),
+        token_ids=token_ids.astype(np.int32),
+        offsets=offsets,
+        index=tokens.index,
+    )
+
+
+def create_token_store_from_df(df: pd.DataFrame) -> TokenStore:
+    """Creates a token store from the `tokens` column of a dataframe.
+
+    Args:
+        df (pd.DataFrame): dataframe with `tokens` column.
+
+    Returns:
+        TokenStore: token store.
+    """
+    assert TOKENS_COL in df.columns
+
+    return create_token_store(df[TOKENS_COL])
+
+
+def get_lengths(store: TokenStore) -> np.ndarray:
+    """Returns the number of tokens of each quote.
+
+    Args:
+        store (TokenStore): token store.
+
+    Returns:
+        np.ndarray: numbers of tokens.
+    """
+    return np.diff(store.offsets)
+
+
+def get_doc_ids(store: TokenStore) -> np.ndarray:
+    """Returns the position of the quote of each token in the flat array.
+
+    Args:
+        store (TokenStore): token store.
+
+    Returns:
+        np.ndarray: positions of the quotes.
+    """
+    return np.repeat(np.arange(len(store)), get_lengths(store))
+
+
+def get_word_ids(store: TokenStore, words: list) -> np.ndarray:
+    """Returns the ids of words in the vocabulary (unknown words are
+    ignored).
+
+    Args:
+        store (TokenStore): token store.
+        words (list): words.
+
+    Returns:
+        np.ndarray: ids of the words.
+    """
+    ids = pd.Index(store.vocabulary).get_indexer(list(words))
+    return ids[ids != -1]
+
+
+def filter_tokens(store: TokenStore, mask: np.ndarray) -> TokenStore:
+    """Keeps the tokens of a mask over the flat array of tokens.
+
+    Args:
+        store (TokenStore): token store.
+        mask (np.ndarray): boolean mask of the tokens to keep.
+
+    Returns:
+        TokenStore: filtered token store (same vocabulary).
+    """
+    counts = np.bincount(get_doc_ids(store)[mask], minlength=len(store))
+    offsets = np.zeros(len(store) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return TokenStore(
+        vocabulary=store.vocabulary,
+        token_ids=store.token_ids[mask],
+        offsets=offsets,
+        index=store.index,
+    )
+
+
+def drop_words(store: TokenStore, words: list) -> TokenStore:
+    """Drops words from the tokens.
+
+    Args:
+        store (TokenStore): token store.
+        words (list): words to drop.
+
+    Returns:
+        TokenStore: token store without the words.
+    """
+    mask = ~np.isin(store.token_ids, get_word_ids(store, words))
+    return filter_tokens(store, mask)
+
+
+def drop_pron_tokens(store: TokenStore) -> TokenStore:
+    """Drops the -PRON- from the tokens.
+
+    Args:
+        store (TokenStore): token store.
+
+    Returns:
+        TokenStore: token store without -PRON-.
+    """
+    return drop_words(store, ['-PRON-'])
+
+
+def take_quotes(store: TokenStore, positions: np.ndarray) -> TokenStore:
+    """Returns the token store of some quotes.
+
+    Args:
+        store (TokenStore): token store.
+        positions (np.ndarray): positions of the quotes, or boolean mask.
+
+    Returns:
+        TokenStore: token store of the quotes (same vocabulary).
+    """
+    positions = np.arange(len(store))[positions]
+    starts = store.offsets[positions]
+    lengths = store.offsets[positions + 1] - starts
+    offsets = np.zeros(len(positions) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    # Position of each kept token in the flat array
+    flat_positions = np.arange(offsets[-1]) + np.repeat(
+        starts - offsets[:-1], lengths
+    )
+    return TokenStore(
+        vocabulary=store.vocabulary,
+        token_ids=store.token_ids[flat_positions],
+        offsets=offsets,
+        index=store.index[positions],
+    )
+
+
+def count_tokens(store: TokenStore) -> pd.Series:
+    """Returns the number of occurrences of each word.
+
+    Args:
+        store (TokenStore): token store.
+
+    Returns:
+        pd.Series: number of occurrences indexed by word.
+    """
+    counts = np.bincount(store.token_ids, minlength=len(store.vocabulary))
+    return pd.Series(counts, index=store.vocabulary)
+
+
+def count_documents(store: TokenStore) -> pd.Series:
+    """Returns the number of quotes containing each word.
+
+    Args:
+        store (TokenStore): token store.
+
+    Returns:
+        pd.Series: number of quotes indexed by word.
+    """
+    matrix = get_csr_matrix(store)
+    counts = np.bincount(matrix.indices, minlength=len(store.vocabulary))
+    return pd.Series(counts, index=store.vocabulary)
+
+
+def add_phrases(
+    store: TokenStore,
+    phrases: list,
+    delimiter: str = '_',
+) -> TokenStore:
+    """Adds the phrases of two consecutive tokens at the end of the tokens of
+    each quote. As with a gensim phrases model, the pairs are matched from
+    left to right and a token is part of at most one phrase.
+
+    Args:
+        store (TokenStore): token store.
+        phrases (list): phrases, as the two words joined by the delimiter.
+        delimiter (str, optional): delimiter of the phrases. Defaults to '_'.
+
+    Returns:
+        TokenStore: token store with the phrases (extended vocabulary).
+    """
+    n_words = len(store.vocabulary)
+
+    # Codes of the pairs of words forming a phrase (all the possible splits
+    # of a phrase whose words contain the delimiter)
+    splits = [
+        (delimiter.join(parts[:i]), delimiter.join(parts[i:]))
+        for parts in (phrase.split(delimiter) for phrase in phrases)
+        for i in range(1, len(parts))
+    ]
+    word_ids = pd.Index(store.vocabulary)
+    first_ids = word_ids.get_indexer([first for first, _ in splits])
+    second_ids = word_ids.get_indexer([second for _, second in splits])
+    first_ids = first_ids.astype(np.int64)
+    known = (first_ids != -1) & (second_ids != -1)
+    phrase_codes = first_ids[known] * n_words + second_ids[known]
+
+    # Pairs of consecutive tokens of the same quote forming a phrase
+    token_ids = store.token_ids.astype(np.int64)
+    codes = token_ids[:-1] * n_words + token_ids[1:]
+    same_quote = np.ones(len(codes), dtype=bool)
+    ends = store.offsets[1:-1]
+    same_quote[ends[(ends > 0) & (ends < len(token_ids))] - 1] = False
+    matched = same_quote & np.isin(codes, phrase_codes)
+
+    # In a run of overlapping pairs, keep every other pair from its start
+    positions = np.flatnonzero(matched)
+    is_start = np.ones(len(positions), dtype=bool)
+    is_start[1:] = positions[1:] != positions[:-1] + 1
+    run_starts = np.maximum.accumulate(np.where(is_start, positions, 0))
+    positions = positions[(positions - run_starts) % 2 == 0]
+
+    # New words of the phrases
+    phrase_codes, phrase_ids = np.unique(
+        codes[positions], return_inverse=True
+    )
+    new_words = [
+        f'{store.vocabulary[code // n_words]}{delimiter}'
+        f'{store.vocabulary[code % n_words]}'
+        for code in phrase_codes.tolist()
+    ]
+    new_ids, vocabulary = pd.factorize(
+        np.concatenate([store.vocabulary, np.array(new_words, dtype=object)])
+    )
+
+    # Phrases of a quote after its tokens
+    lengths = get_lengths(store)
+    phrase_counts = np.bincount(
+        get_doc_ids(store)[positions], minlength=len(store)
+    )
+    offsets = np.zeros(len(store) + 1, dtype=np.int64)
+    np.cumsum(lengths + phrase_counts, out=offsets[1:])
+    is_token = np.repeat(
+        np.tile([True, False], len(store)),
+        np.column_stack([lengths, phrase_counts]).ravel(),
+    )
+    new_token_ids = np.empty(offsets[-1], dtype=np.int32)
+    new_token_ids[is_token] = store.token_ids
+    new_token_ids[~is_token] = new_ids[n_words:][phrase_ids]
+    return TokenStore(
+        vocabulary=np.asarray(vocabulary, dtype=object),
+        token_ids=new_token_ids,
+        offsets=offsets,
+        index=store.index,
+    )
+
+
+def get_csr_matrix(
+    store: TokenStore,
+    token_ids: np.ndarray = None,
+    n_words: int = None,
+) -> csr_matrix:
+    """Returns the sparse matrix of counts (quotes x words).
+
+    Args:
+        store (TokenStore): token store.
+        token_ids (np.ndarray, optional): ids of the tokens to use instead
+        of the vocabulary ids, -1 for the dropped tokens. Defaults to None.
+        n_words (int, optional): number of columns. Defaults to None (size
+        of the vocabulary, or maximum id + 1 with other token ids).
+
+    Returns:
+        csr_matrix: matrix of counts, with sorted indices.
+    """
+    if token_ids is None:
+        token_ids = store.token_ids
+        if n_words is None:
+            n_words = len(store.vocabulary)
+    else:
+        # Drop the tokens without id
+        mask = token_ids != -1
+        store = filter_tokens(store, mask)
+        token_ids = token_ids[mask]
+        if n_words is None:
+            n_words = token_ids.max(initial=-1) + 1
+
+    data = np.ones(len(token_ids), dtype=np.int32)
+    matrix = csr_matrix(
+        (data, token_ids, store.offsets),
+        shape=(len(store), n_words),
+        copy=True,
+    )
+    matrix.sum_duplicates()
+    return matrix
+
+
+def get_bow_series(store: TokenStore, token2id: dict) -> pd.Series:
+    """Returns the Bag-of-words representation of the quotes with the ids of
+    a dictionary (like `Dictionary.doc2bow`).
+
+    Args:
+        store (TokenStore): token store.
+        token2id (dict): ids of the words (`Dictionary.token2id`).
+
+    Returns:
+        pd.Series: lists of (word id, count).
+    """
+    # Map the vocabulary to the ids of the dictionary
+    vocabulary_ids = np.array(
+        [token2id.get(word, -1) for word in store.vocabulary],
+        dtype=np.int64,
+    )
+    n_words = max(token2id.values(), default=-1) + 1
+    matrix = get_csr_matrix(store, vocabulary_ids[store.token_ids], n_words)
+
+    indices = matrix.indices.tolist()
+    data = matrix.data.tolist()
+    bow = [
+        list(zip(indices[start:end], data[start:end]))
+        for start, end in zip(matrix.indptr[:-1], matrix.indptr[1:])
+    ]
+    return pd.Series(bow, index=store.index)
+
+
+def get_tokens_series(store: TokenStore) -> pd.Series:
+    """Returns the tokens as a series of lists of tokens.
+
+    Args:
+        store (TokenStore): token store.
+
+    Returns:
+        pd.Series: lists of tokens.
+    """
+    words = store.vocabulary[store.token_ids].tolist()
+    tokens = [
+        words[start:end]
+        for start, end in zip(store.offsets[:-1], store.offsets[1:])
+    ]
+    return pd.Series(tokens, index=store.index, dtype=object)
+
+
+def join_tokens(store: TokenStore) -> str:
+    """Joins all the tokens of a token store.
+
+    Args:
+        store (TokenStore): token store.
+
+    Returns:
+        str: joined tokens.
+    """
+    return ' '.join(store.vocabulary[store.token_ids])
+
+
+def save_token_store(store: TokenStore, filename: str) -> None:
+    """Saves a token store in a npz file.
+
+    Args:
+        store (TokenStore): token store.
+        filename (str): path to the npz file.
+    """
+    is_numeric = pd.api.types.is_numeric_dtype(store.index)
+    np.savez(
+        filename,
+        vocabulary=store.vocabulary.astype(str),
+        token_ids=store.token_ids,
+        offsets=store.offsets,
+        index=store.index.to_numpy(dtype=None if is_numeric else str),
+        index_name=str(store.index.name or ''),
+    )
+
+
+def load_token_store(filename: str) -> TokenStore:
+    """Loads a token store from a npz file.
+
+    Args:
+        filename (str): path to the npz file.
+
+    Returns:
+        TokenStore: token store.
+    """
+    with np.load(filename) as data:
+        index = data['index']
+        if index.dtype.kind == 'U':
+            index = index.astype(object)
+        return TokenStore(
+            vocabulary=data['vocabulary'].astype(object),
+            token_ids=data['token_ids'],
+            offsets=data['offsets'],
+            index=pd.Index(index, name=str(data['index_name']) or None),
+        )
@@ -6,7 +6,9 @@ import pandas as pd
 from tqdm import tqdm
 from wordcloud import STOPWORDS, WordCloud
 
+from . import token_store
 from .constants import TOKENS_COL
+from .token_store import TokenStore, take_quotes
 
 # Init progress bar
 tqdm.pandas()
@@ -28,15 +30,20 @@ COLORDICT = {
 }
 
 
-def join_tokens(df: pd.DataFrame) -> str:
+def join_tokens(df: pd.DataFrame, store: TokenStore = None) -> str:
     """Joins the tokenized quotations of a dataframe.
 
     Args:
         df (pd.DataFrame): dataframe of quotes.
+        store (TokenStore, optional): token store of the quotes, with the
+        same index. Defaults to None (tokens of the `tokens` column).
 
     Returns:
         str: joined tokens.
     """
+    if store is not None:
+        return token_store.join_tokens(store)
+
     return ' '.join(' '.join(tokens) for tokens in df[TOKENS_COL])
 
 
@@ -68,22 +75,31 @@ def plot_wordcloud(
     plt.show()
 
 
-def create_wordcloud_party(df: pd.DataFrame, party_name: str) -> WordCloud:
+def create_wordcloud_party(
+    df: pd.DataFrame,
+    party_name: str,
+    store: TokenStore = None,
+) -> WordCloud:
     """Generates a word cloud for a party.
 
     Args:
         df (pd.DataFrame): dataframe of quotes.
         party_name (str): party name.
+        store (TokenStore, optional): token store of the quotes, with the
+        same index. Defaults to None (tokens of the `tokens` column).
 
     Returns:
         WordCloud: wordcloud object.
     """
     assert 'party_name' in df.columns
 
-    df_party = df[df['party_name'] == party_name]
+    mask = (df['party_name'] == party_name).to_numpy(bool, na_value=False)
+    df_party = df[mask]
+    if store is not None:
+        store = take_quotes(store, mask)
 
     # Join quotations
-    text = join_tokens(df_party)
+    text = join_tokens(df_party, store)
 
     # Generate word cloud
     wordcloud = WordCloud(
@@ -0,0 +1,54 @@
+import bz2
+import random
+
+import pytest
+
+import src.bz2_parallel as bz2_parallel
+from src.bz2_parallel import (find_bz2_blocks, iter_decompress_bz2,
+                              read_lines_bz2, write_bz2)
+
+
+def make_data(n_lines=20_000, seed=0):
+    rng = random.Random(seed)
+    words = [f'word{i}' for i in range(500)]
+    return b'\n'.join(
+        ' '.join(rng.choices(words, k=rng.randint(1, 12))).encode()
+        for _ in range(n_lines)
+    ) + b'\n'
+
+
+@pytest.fixture
+def bz2_file(tmp_path):
+    data = make_data()
+    filename = tmp_path / 'data.bz2'
+    write_bz2(filename, data, max_workers=2, compresslevel=1)
+    return filename, data
+
+
+def test_roundtrip(bz2_file):
+    filename, data = bz2_file
+    with open(filename, 'rb') as f:
+        compressed = f.read()
+
+    assert len(find_bz2_blocks(compressed)) > 3
+    assert bz2.decompress(compressed) == data
+    assert read_lines_bz2(filename, max_workers=2) == data.splitlines()
+
+
+@pytest.mark.parametrize('max_workers', [1, 3])
+def test_spurious_block_magic(bz2_file, monkeypatch, max_workers):
+    filename, data = bz2_file
+
+    # A magic number found inside the compressed data of the third block
+    # splits it into two invalid blocks
+    def find_blocks_with_spurious_magic(compressed):
+        blocks = find_bz2_blocks(compressed)
+        level, start, end = blocks[2]
+        middle = (start + end) // 2
+        return blocks[:2] + [(level, start, middle), (level, middle, end)] \
+            + blocks[3:]
+
+    monkeypatch.setattr(
+        bz2_parallel, 'find_bz2_blocks', find_blocks_with_spurious_magic
+    )
+    assert b''.join(iter_decompress_bz2(filename, max_workers)) == data
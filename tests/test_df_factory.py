@@ -0,0 +1,86 @@
+import bz2
+import json
+
+import pandas as pd
+import pytest
+
+from src.df_factory import (add_col_qid, create_df_from_bz2,
+                            create_df_from_bz2_dir)
+from src.token_store import create_token_store, get_tokens_series
+
+COLUMNS = ['quotation', 'speaker', 'qids']
+
+QUOTES = [
+    {
+        'quoteID': '2020-01-01-000001',
+        'quotation': 'We will win.',
+        'speaker': 'Joe Biden',
+        'qids': ['Q6279'],
+        'urls': ['https://www.nytimes.com/a'],
+    },
+    {
+        'quoteID': '2020-01-01-000002',
+        'quotation': 'No comment.',
+        'speaker': 'None',
+        'qids': [],
+        'urls': ['https://www.nytimes.com/b'],
+    },
+]
+
+
+def write_quotes(filename, quotes):
+    with bz2.open(filename, 'wb') as f:
+        for quote in quotes:
+            f.write(json.dumps(quote).encode('utf-8') + b'\n')
+
+
+@pytest.mark.parametrize('parallel', [False, True])
+def test_create_df_from_bz2_projected_empty(tmp_path, parallel):
+    empty_filename = tmp_path / 'empty.json.bz2'
+    quotes_filename = tmp_path / 'quotes.json.bz2'
+    write_quotes(empty_filename, [])
+    write_quotes(quotes_filename, QUOTES)
+
+    df_empty = create_df_from_bz2(empty_filename, parallel, COLUMNS)
+    df_quotes = create_df_from_bz2(quotes_filename, parallel, COLUMNS)
+
+    assert df_empty.empty
+    assert df_empty.index.name == df_quotes.index.name
+    assert df_empty.dtypes.to_dict() == df_quotes.dtypes.to_dict()
+    assert df_quotes.loc['2020-01-01-000002', 'qids'] == []
+
+
+@pytest.mark.parametrize('columns', [None, COLUMNS])
+def test_create_df_from_bz2_dir_arrow_lists(tmp_path, columns):
+    write_quotes(tmp_path / 'a.json.bz2', QUOTES[1:])
+    write_quotes(tmp_path / 'b.json.bz2', [])
+    write_quotes(tmp_path / 'c.json.bz2', QUOTES[:1])
+
+    df = create_df_from_bz2_dir(tmp_path, columns=columns)
+    df_arrow = create_df_from_bz2_dir(
+        tmp_path, columns=columns, max_workers=2, arrow_lists=True
+    )
+
+    assert isinstance(df_arrow['qids'].dtype, pd.ArrowDtype)
+    assert df_arrow.index.tolist() == df.index.tolist()
+    assert df_arrow['qids'].tolist() == df['qids'].tolist()
+    assert get_tokens_series(create_token_store(df_arrow['qids'])).equals(
+        df['qids']
+    )
+
+    add_col_qid(df)
+    add_col_qid(df_arrow)
+    assert df_arrow['qid'].equals(df['qid'])
+
+
+@pytest.mark.parametrize('columns', [None, COLUMNS])
+def test_create_df_from_bz2_dir_workers(tmp_path, columns):
+    write_quotes(tmp_path / 'a.json.bz2', QUOTES[1:])
+    write_quotes(tmp_path / 'b.json.bz2', [])
+    write_quotes(tmp_path / 'c.json.bz2', QUOTES[:1])
+
+    df = create_df_from_bz2_dir(tmp_path, columns=columns)
+    df_workers = create_df_from_bz2_dir(
+        tmp_path, columns=columns, max_workers=2
+    )
+    pd.testing.assert_frame_equal(df_workers, df)
@@ -0,0 +1,16 @@
+import pytest
+
+from src.import_time import benchmark_import_time, check_import
+
+
+@pytest.mark.parametrize(
+    'module', ['src.sentiment_analysis', 'src.text_processing'],
+)
+def test_no_lazy_package_imported(module):
+    assert check_import(module, max_seconds=None) > 0
+
+
+def test_benchmark_reports_import_errors():
+    df = benchmark_import_time(['src.paths', 'src.missing_module'])
+    assert df['module'].tolist() == ['src.paths', 'src.missing_module']
+    assert df['error'].isna().tolist() == [True, False]
@@ -0,0 +1,33 @@
+import pandas as pd
+
+from src.parquet_files import create_df_from_dataset, write_partitioned_chunk
+
+
+def make_chunk(quote_ids, qids):
+    df = pd.DataFrame({
+        'quoteID': quote_ids,
+        'quotation': [f'Quote {i}' for i in range(len(quote_ids))],
+        'qids': qids,
+        'qid': [x[0] if x else None for x in qids],
+        'date': pd.to_datetime([f'{q[:10]} 12:00:00' for q in quote_ids]),
+    })
+    return df.set_index('quoteID')
+
+
+def test_chunks_without_qids_have_the_same_schema(tmp_path):
+    write_partitioned_chunk(
+        make_chunk(['2019-01-01-000001', '2020-01-01-000002'], [[], []]),
+        tmp_path, 'NYT', 0,
+    )
+    write_partitioned_chunk(
+        make_chunk(['2020-02-01-000003'], [['Q76', 'Q1']]),
+        tmp_path, 'NYT', 1,
+    )
+
+    df = create_df_from_dataset(tmp_path, ['qids', 'qid', 'year'])
+    assert df.index.tolist() == [
+        '2019-01-01-000001', '2020-01-01-000002', '2020-02-01-000003',
+    ]
+    assert df['qids'].tolist() == [[], [], ['Q76', 'Q1']]
+    assert df['qid'].isna().tolist() == [True, True, False]
+    assert df['year'].tolist() == [2019, 2020, 2020]
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.sentiment_analysis import (compute_polarity_scores,
+                                    compute_resampling_tests, compute_ttests,
+                                    get_compound_score, get_polarity_scores,
+                                    make_html_table_ttests)
+
+PARTIES = ['democratic party', 'republican party', 'other party']
+
+
+def make_df_topics(n_quotes=3000, n_topics=3, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({'party_name': rng.choice(PARTIES, n_quotes)})
+    is_democrat = (df['party_name'] == PARTIES[0]).to_numpy()
+    for i in range(n_topics):
+        scores = rng.uniform(-1, 1, n_quotes) + 0.1 * i * is_democrat
+        scores[rng.random(n_quotes) < 0.5] = np.nan
+        df[f'topic_{i}'] = scores
+    return df
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_polarity_scores_match_single_quote(max_workers):
+    texts = [
+        'I love this great country!', '', '   ', '...', '?!?!', ':)',
+        'The tax cut is a terrible, terrible idea.', 'Not bad at all.',
+        'WAR IS HELL', "We don't know.",
+    ] * 3
+    scores = compute_polarity_scores(
+        texts,
+        ['neg', 'neu', 'pos', 'compound'],
+        max_workers=max_workers,
+        chunksize=4,
+    )
+
+    assert scores[:, 3].tolist() == [get_compound_score(t) for t in texts]
+    expected = [
+        [get_polarity_scores(t)[c] for c in ['neg', 'neu', 'pos', 'compound']]
+        for t in texts
+    ]
+    assert scores.tolist() == expected
+
+
+def test_resampling_tests_reproducible_across_workers():
+    df = make_df_topics()
+    kwargs = dict(n_resamples=2500, seed=42)
+    df_serial = compute_resampling_tests(df, max_workers=1, **kwargs)
+    df_parallel = compute_resampling_tests(df, max_workers=2, **kwargs)
+    pd.testing.assert_frame_equal(df_serial, df_parallel)
+
+    df_other = compute_resampling_tests(df, n_resamples=2500, seed=7)
+    assert not df_other['ci_low'].equals(df_serial['ci_low'])
+
+    # Confidence intervals around the observed differences
+    assert (df_serial['ci_low'] < df_serial['difference']).all()
+    assert (df_serial['difference'] < df_serial['ci_high']).all()
+
+
+def test_permutation_counts_the_observed_split():
+    # Every split is at least as extreme as the observed one, whose
+    # permuted difference has other rounding errors
+    df = pd.DataFrame({
+        'party_name': PARTIES[:1] * 3 + PARTIES[1:2],
+        'topic': [0.76, 0.27, 0.18, 0.63],
+    })
+    df_tests = compute_resampling_tests(df, n_resamples=1000)
+    assert df_tests.loc[0, 'pvalue'] == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize('equal_var', [True, False])
+def test_compute_ttests_matches_scipy(equal_var):
+    from scipy.stats import ttest_ind
+
+    df = make_df_topics()
+    df['newspaper'] = np.where(np.arange(len(df)) % 2, 'NYT', 'CNN')
+    pairs = [(PARTIES[0], PARTIES[1]), (PARTIES[0], PARTIES[2])]
+    df_ttests = compute_ttests(
+        df, party_pairs=pairs, by=['newspaper'], equal_var=equal_var
+    )
+
+    assert len(df_ttests) == 2 * 2 * 3
+    for row in df_ttests.itertuples():
+        df_group = df[df['newspaper'] == row.newspaper]
+        scores = df_group.groupby('party_name')[row.topic]
+        expected = ttest_ind(
+            scores.get_group(row.party_a).dropna(),
+            scores.get_group(row.party_b).dropna(),
+            equal_var=equal_var,
+        )
+        assert row.statistic == pytest.approx(expected.statistic)
+        assert row.pvalue == pytest.approx(expected.pvalue)
+
+
+def test_compute_ttests_ignores_missing_groups():
+    df = make_df_topics(n_quotes=300)
+    df['newspaper'] = np.where(np.arange(len(df)) % 2, 'NYT', 'CNN')
+    df_missing = df.copy()
+    df_missing.loc[0, 'party_name'] = np.nan
+    df_missing.loc[1, 'newspaper'] = np.nan
+
+    df_ttests = compute_ttests(df_missing, by=['newspaper'])
+    expected = compute_ttests(df.drop(index=[0, 1]), by=['newspaper'])
+    pd.testing.assert_frame_equal(df_ttests, expected)
+
+
+def test_html_table_ttests_shows_groups_and_pairs():
+    df = make_df_topics()
+    df['newspaper'] = np.where(np.arange(len(df)) % 2, 'NYT', 'CNN')
+    pairs = [(PARTIES[0], PARTIES[1]), (PARTIES[0], PARTIES[2])]
+    html = make_html_table_ttests(
+        compute_ttests(df, party_pairs=pairs, by=['newspaper'])
+    )
+    for text in ['Newspaper', 'Party A', 'Party B', 'NYT', PARTIES[2]]:
+        assert text in html
+
+    html = make_html_table_ttests(compute_ttests(df.drop(columns='newspaper')))
+    assert 'Party A' not in html
@@ -0,0 +1,159 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from empath import Empath
+from gensim.corpora import Dictionary, MmCorpus
+
+from src import text_processing
+from src.text_processing import (create_df_topics, get_corpus_fingerprint,
+                                 get_lda_model, get_lda_model_filename,
+                                 get_topics, get_topics_list,
+                                 get_updated_lda_model_filename,
+                                 load_lda_metadata, serialize_corpus,
+                                 update_lda_model)
+from src.token_store import create_token_store
+
+
+def test_get_topics_with_dict_keys():
+    lexicon = Empath()
+    lexicon.cats = {
+        'economy': ['tax', 'jobs', 'market'],
+        'health': ['hospital', 'doctor', 'tax'],
+    }
+    topics_dict = {'economy': ['tax'], 'health': ['doctor']}
+    tokens = pd.Series(
+        [['tax', 'cut'], ['doctor', 'jobs'], ['weather'], []],
+        index=[3, 5, 7, 9],
+    )
+    store = create_token_store(tokens)
+
+    topics, counts = get_topics(store, lexicon, topics_dict.keys())
+
+    expected = [
+        get_topics_list(t, lexicon, list(topics_dict)) for t in tokens
+    ]
+    assert topics.tolist() == expected
+    assert topics.index.tolist() == [3, 5, 7, 9]
+    assert counts.shape == (4, 2)
+
+
+def test_lda_cache_keyed_on_bow_fingerprint(tmp_path, monkeypatch):
+    tokens = [['tax', 'jobs'], ['doctor', 'hospital'], ['tax', 'doctor']] * 4
+    dictionary = Dictionary(tokens)
+    df = pd.DataFrame({'bow': [dictionary.doc2bow(t) for t in tokens]})
+    cache_dir = str(tmp_path)
+
+    fingerprint = get_corpus_fingerprint(df['bow'], dictionary)
+    corpus_dir = serialize_corpus(iter(df['bow']), dictionary, cache_dir)
+    assert os.path.basename(corpus_dir) == fingerprint
+
+    params = dict(num_topics=2, workers=1, passes=1, cache_dir=cache_dir)
+    lda_model = get_lda_model(df, dictionary, **params)
+
+    # The cached corpus and model are reused without serializing again
+    def fail_serialize(*args, **kwargs):
+        raise AssertionError('corpus serialized again')
+
+    monkeypatch.setattr(MmCorpus, 'serialize', fail_serialize)
+    cached_model = get_lda_model(df, dictionary, **params)
+    assert (cached_model.get_topics() == lda_model.get_topics()).all()
+    assert os.listdir(cache_dir) == [fingerprint]
+
+
+def test_update_lda_model_keeps_cached_model(tmp_path):
+    tokens = [['tax', 'jobs'], ['doctor', 'hospital'], ['tax', 'doctor']] * 4
+    dictionary = Dictionary(tokens)
+    df = pd.DataFrame({'bow': [dictionary.doc2bow(t) for t in tokens]})
+    cache_dir = str(tmp_path)
+    params = dict(num_topics=2, workers=1, chunksize=2000, passes=1)
+
+    lda_model = get_lda_model(df, dictionary, cache_dir=cache_dir, **params)
+    corpus_dir = os.path.join(
+        cache_dir, get_corpus_fingerprint(df['bow'], dictionary)
+    )
+    model_filename = get_lda_model_filename(corpus_dir, params)
+    metadata = load_lda_metadata(model_filename)
+
+    new_tokens = [['vaccine', 'doctor'], ['vaccine', 'border']] * 3
+    updated_model = update_lda_model(
+        model_filename, [new_tokens], no_below=2, cache_dir=cache_dir
+    )
+    assert updated_model.num_terms == len(dictionary) + 2
+
+    # The cached model of the original corpus is unchanged
+    assert load_lda_metadata(model_filename) == metadata
+    cached_model = get_lda_model(
+        df, dictionary, cache_dir=cache_dir, **params
+    )
+    assert cached_model.num_terms == len(dictionary)
+    assert (cached_model.get_topics() == lda_model.get_topics()).all()
+
+    # The updated model is saved with the new corpus
+    new_corpus_dir, = (
+        os.path.join(cache_dir, name) for name in os.listdir(cache_dir)
+        if name != os.path.basename(corpus_dir)
+    )
+    ranges = load_lda_metadata(
+        get_updated_lda_model_filename(new_corpus_dir, model_filename)
+    )['ranges']
+    assert [r['stop'] for r in ranges] == [len(tokens), len(tokens) + 6]
+    assert ranges[-1]['corpus'] == os.path.basename(new_corpus_dir)
+
+
+def test_add_col_tokens_one_pipe_per_cache_chunk(tmp_path, monkeypatch):
+    calls = []
+
+    def get_tokens_batch(texts, batch_size, n_process):
+        calls.append(len(texts))
+        return [text.split() for text in texts]
+
+    monkeypatch.setattr(
+        text_processing, 'get_tokens_batch', get_tokens_batch
+    )
+    monkeypatch.setattr(
+        text_processing, 'get_tokenizer_version', lambda: 'split'
+    )
+    df = pd.DataFrame({'quotation': [f'quote {i}' for i in range(25_000)]})
+    text_processing.add_col_tokens(
+        df,
+        batch_size=1000,
+        n_process=2,
+        cache_filename=str(tmp_path / 'tokens.sqlite'),
+    )
+    assert calls == [20_000, 5_000]
+    assert df['tokens'].iloc[-1] == ['quote', '24999']
+
+
+@pytest.mark.parametrize('sparse', [False, True])
+def test_create_df_topics_matches_row_wise(sparse):
+    categories = ['economy', 'health', 'war']
+    df = pd.DataFrame(
+        {
+            'topics': [
+                ['economy'], [], ['health', 'economy'], ['war', 'war'],
+                ['weather'], [], ['economy', 'health', 'war'],
+            ],
+            'compound_score': [0.5, 0.2, -0.3, 0.0, 0.9, -0.1, 0.7],
+        },
+        index=[10, 3, 7, 1, 8, 2, 5],
+    )
+
+    # Row-wise computation of the dataframe of topics
+    expected = pd.DataFrame({
+        f'{topic}_compound_score': df.apply(
+            lambda x: x['compound_score'] if topic in x['topics']
+            else np.nan,
+            axis=1,
+        )
+        for topic in categories
+    })
+
+    df_topics = create_df_topics(df, categories, sparse=sparse)
+    if sparse:
+        assert all(
+            isinstance(dtype, pd.SparseDtype) for dtype in df_topics.dtypes
+        )
+        df_topics = df_topics.sparse.to_dense()
+    pd.testing.assert_frame_equal(df_topics, expected)
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+from gensim.corpora import Dictionary
+from gensim.models.phrases import Phrases
+
+from src.data_cleaning import drop_pron_tokens
+from src.text_processing import (add_bigrams_to_list, add_bigrams_to_store,
+                                 add_col_bow,
+                                 create_dictionary_from_tokens_col)
+from src.token_store import (create_token_store, get_tokens_series,
+                             take_quotes)
+from src.wordcloud import join_tokens
+
+
+def make_tokens(n_quotes=300, seed=0):
+    rng = np.random.default_rng(seed)
+    words = ['tax', 'jobs', '-PRON-', 'vote', 'health', 'border', 'war']
+    words.extend(f'word{i}' for i in range(40))
+    words = np.array(words, dtype=object)
+    return pd.Series(
+        [
+            rng.choice(words, size=rng.integers(0, 12)).tolist()
+            for _ in range(n_quotes)
+        ],
+        index=pd.Index([f'q{i:04d}' for i in range(n_quotes)]),
+    )
+
+
+def test_roundtrip_and_take_quotes():
+    tokens = make_tokens()
+    store = create_token_store(tokens)
+    assert get_tokens_series(store).equals(tokens)
+
+    mask = np.arange(len(tokens)) % 3 == 0
+    assert get_tokens_series(take_quotes(store, mask)).equals(tokens[mask])
+
+
+def test_drop_pron_tokens():
+    tokens = make_tokens()
+    df = pd.DataFrame({'tokens': tokens})
+    store = drop_pron_tokens(df)
+
+    expected = tokens.apply(lambda x: [t for t in x if t != '-PRON-'])
+    assert df['tokens'].equals(expected)
+    assert get_tokens_series(store).equals(expected)
+
+
+def test_dictionary_and_bow_match_gensim():
+    tokens = make_tokens()
+    df = pd.DataFrame({'tokens': tokens})
+    store = drop_pron_tokens(df)
+
+    dictionary = create_dictionary_from_tokens_col(df, 5, 0.5, store=store)
+    expected = Dictionary(df['tokens'])
+    expected.filter_extremes(no_below=5, no_above=0.5)
+    assert dictionary.token2id == expected.token2id
+    assert dictionary.dfs == expected.dfs
+    assert dictionary.cfs == expected.cfs
+    assert (dictionary.num_docs, dictionary.num_pos, dictionary.num_nnz) \
+        == (expected.num_docs, expected.num_pos, expected.num_nnz)
+
+    add_col_bow(df, dictionary, store)
+    assert df['bow'].tolist() == df['tokens'].map(expected.doc2bow).tolist()
+
+
+def test_join_tokens_with_store():
+    tokens = make_tokens()
+    df = pd.DataFrame({'tokens': tokens})
+    assert join_tokens(df, create_token_store(tokens)).split() \
+        == join_tokens(df).split()
+
+
+def test_add_phrases_matches_gensim():
+    # Overlapping and chained bigrams, repeated tokens and bigrams across
+    # the end of a quote and the start of the next one
+    sentences = [
+        ['new', 'york', 'city'],
+        ['new', 'york', 'new', 'york', 'city', 'hall'],
+        ['york', 'city', 'hall', 'new'],
+        ['york', 'new', 'york', 'york', 'city'],
+        ['ha', 'ha', 'ha', 'ha', 'ha'],
+        ['ha', 'ha', 'ha', 'new', 'york', 'city', 'city', 'hall'],
+        ['city', 'hall', 'ha'],
+        [],
+        ['new'],
+    ] * 3
+    phrases = Phrases(sentences, min_count=1, threshold=0.1).freeze()
+    bigrams = {
+        phrase for phrase, score in phrases.phrasegrams.items()
+        if score > phrases.threshold
+    }
+    assert {'new_york', 'york_city', 'city_hall', 'ha_ha'} <= bigrams
+
+    tokens = pd.Series(sentences, index=np.arange(len(sentences)) * 2)
+    store = add_bigrams_to_store(create_token_store(tokens), phrases)
+    expected = tokens.map(lambda t: add_bigrams_to_list(list(t), phrases))
+    assert get_tokens_series(store).equals(expected)